@@ -13,126 +13,192 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from flask import Flask, render_template, request, send_file, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, send_file, jsonify, redirect, url_for, stream_with_context
 from werkzeug.utils import secure_filename
 import threading
+import queue
 import uuid
+import json
+import logging
+import time
+from urllib.parse import quote
 
 # Afegir directori arrel al path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from config import OUTPUT_DIR, INPUT_DIR
-from extractors import extract_text, extract_images
-from processors import describe_images, structure_presentation, generate_missing_images
-from generators import create_presentation, create_study_guide
+from config import OUTPUT_DIR, INPUT_DIR, WORKER_CONCURRENCY, MAX_QUEUED_TASKS, X_ACCEL_REDIRECT_PREFIX
 from database import (
-    init_db, get_api_keys, set_api_keys, has_valid_keys,
+    get_api_keys, set_api_keys, has_valid_keys,
     get_session_stats, get_global_stats, increment_presentations, log_usage,
     register_user, create_session_with_user, update_user_stats,
     get_user_stats, get_all_users_stats,
     save_presentation, get_user_presentations, get_all_presentations,
-    delete_presentation, get_presentation_path
+    delete_presentation, get_presentation_path,
+    create_task, update_task, get_task, delete_task, purge_old_tasks, transaction
 )
 
-# Inicialitzar base de dades
-init_db()
+# Els generadors i el generador d'imatges informen del progrés amb logging (com els print de la resta)
+logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB màxim
 app.config['UPLOAD_FOLDER'] = str(INPUT_DIR)
+app.config['TEMPLATES_AUTO_RELOAD'] = False  # Plantilles estàtiques
+app.config['USE_X_SENDFILE'] = bool(X_ACCEL_REDIRECT_PREFIX)  # Descàrregues servides per nginx
+app.jinja_env.auto_reload = False
 
-# Estat de les tasques en curs
-tasks = {}
+# Compilar la plantilla principal en arrencar, fora del camí de la primera petició
+app.jinja_env.get_template('index.html')
+
+# Mida dels blocs per escriure les pujades a disc
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Cua de treballs i pool de workers (s'arrenquen al primer ús)
+job_queue = queue.Queue(maxsize=MAX_QUEUED_TASKS)
+_workers = []
+_workers_lock = threading.Lock()
+
+# Avís de canvis d'estat per als clients SSE d'aquest procés
+task_events = threading.Condition()
+_task_version = 0  # S'incrementa a cada canvi (evita perdre avisos entre lectura i espera)
+SSE_WAIT_SECONDS = 1  # Espera màxima entre lectures de l'estat (canvis d'altres processos)
+SSE_KEEPALIVE_SECONDS = 15  # Comentari periòdic perquè els proxies no tallin la connexió
+SSE_MAX_SECONDS = 300  # Durada màxima d'una connexió (el navegador es reconnecta sol)
+
+# Límits de l'estat de tasques guardat
+TASK_RETENTION_HOURS = 24
+MAX_STORED_TASKS = 500
+
+
+def _update_task(task_id, **fields):
+    """Actualitza l'estat d'una tasca i avisa els clients SSE."""
+    update_task(task_id, **fields)
+    _notify_task_change()
+
+
+def _notify_task_change():
+    """Desperta els streams SSE perquè tornin a llegir l'estat."""
+    global _task_version
+    with task_events:
+        _task_version += 1
+        task_events.notify_all()
+
+
+def _worker():
+    """Consumeix treballs de la cua i els processa un a un."""
+    while True:
+        job = job_queue.get()
+        try:
+            process_presentation(*job)
+        finally:
+            job_queue.task_done()
+
+
+def _ensure_workers():
+    """Arrenca els workers si encara no ho estan (després del fork de gunicorn)."""
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(WORKER_CONCURRENCY):
+            thread = threading.Thread(target=_worker, name=f"menag-worker-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
 
 
 def allowed_file(filename):
     """Verifica si el fitxer és un PDF."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'pdf'
+    return filename.lower().endswith('.pdf')
 
 
 def process_presentation(task_id, pdf_path, chapter_name, group_name, skip_images, api_keys=None, user_name=None):
     """Processa la presentació en segon pla."""
     try:
-        tasks[task_id]['status'] = 'processing'
-        tasks[task_id]['progress'] = 'Extraient text del PDF...'
+        # Imports pesats (PyMuPDF, SDKs d'Anthropic/Google, python-pptx) només quan hi ha feina
+        from extractors import extract_all
+        from processors import describe_images, structure_presentation, generate_missing_images
+        from generators import create_presentation, create_study_guide
+
+        _update_task(task_id, status='processing', progress='Extraient text i imatges del PDF...')
 
         # Obtenir API keys
         anthropic_key = api_keys.get('anthropic') if api_keys else None
         google_key = api_keys.get('google') if api_keys else None
 
-        # 1. Extreure text
-        chapter_text = extract_text(pdf_path)
-        tasks[task_id]['progress'] = f'Text extret ({len(chapter_text.split())} paraules)'
-
-        # 2. Extreure imatges
+        # 1-2. Extreure text i imatges (una sola lectura del PDF)
         image_catalog = []
-        tasks[task_id]['progress'] = 'Extraient imatges del PDF...'
-        images = extract_images(pdf_path)
-        tasks[task_id]['progress'] = f'Extretes {len(images)} imatges'
+        chapter_text, images = extract_all(pdf_path)
+        _update_task(task_id, progress=f'Text extret ({len(chapter_text.split())} paraules), {len(images)} imatges')
 
         if images:
-            tasks[task_id]['progress'] = 'Analitzant imatges amb Gemini...'
+            _update_task(task_id, progress='Analitzant imatges amb Gemini...')
             image_catalog = describe_images(images, session_id=task_id, api_key=google_key)
 
         # 3. Estructurar amb Opus 4.5
-        tasks[task_id]['progress'] = 'Estructurant presentació amb Claude Opus 4.5...'
+        _update_task(task_id, progress='Estructurant presentació amb Claude Opus 4.5...')
         plan = structure_presentation(
             chapter_text,
             image_catalog,
             chapter_name,
             group_name,
             session_id=task_id,
-            api_key=anthropic_key
+            api_key=anthropic_key,
+            on_progress=lambda slides: _update_task(
+                task_id, progress=f'Estructurant presentació amb Claude Opus 4.5... ({slides} diapositives rebudes)'
+            )
         )
-        tasks[task_id]['progress'] = f'Generades {len(plan.slides)} diapositives'
+        _update_task(task_id, progress=f'Generades {len(plan.slides)} diapositives')
 
         # 4. Generar imatges (si cal)
         if not skip_images:
-            tasks[task_id]['progress'] = 'Generant imatges amb Nano Banana...'
+            _update_task(task_id, progress='Generant imatges amb Nano Banana...')
             plan = generate_missing_images(plan, image_catalog, session_id=task_id, api_key=google_key)
 
         # 5. Crear fitxers
-        tasks[task_id]['progress'] = 'Generant PowerPoint...'
+        _update_task(task_id, progress='Generant PowerPoint...')
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_base = OUTPUT_DIR / f"{chapter_name}_{group_name}_{timestamp}"
 
         pptx_path = create_presentation(plan, f"{output_base}.pptx")
         # docx_path = create_study_guide(plan, f"{output_base}_xuleta.docx")  # DESACTIVAT
 
-        # Incrementar comptador de presentacions
-        increment_presentations(task_id)
-
-        # Obtenir estadístiques de la sessió
-        session_stats = get_session_stats(task_id)
-        session_cost = session_stats.get('total_cost_usd', 0)
-
-        # Actualitzar estadístiques de l'usuari
-        if user_name:
-            update_user_stats(user_name, session_cost, presentations=1)
-
-        # Guardar presentació a la base de dades
-        save_presentation(
-            task_id=task_id,
-            user_name=user_name or "anonymous",
-            chapter_name=chapter_name,
-            group_name=group_name,
-            slides_count=len(plan.slides),
-            cost_usd=session_cost,
-            pptx_path=str(pptx_path)
-        )
-
-        # Completat
-        tasks[task_id]['status'] = 'completed'
-        tasks[task_id]['progress'] = 'Completat!'
-        tasks[task_id]['pptx_path'] = str(pptx_path)
-        tasks[task_id]['docx_path'] = None  # DESACTIVAT
-        tasks[task_id]['slides_count'] = len(plan.slides)
-        tasks[task_id]['cost_usd'] = session_cost
+        # Estadístiques finals en una sola transacció (un únic commit)
+        with transaction():
+            # Incrementar comptador de presentacions
+            increment_presentations(task_id)
+
+            # Obtenir estadístiques de la sessió
+            session_stats = get_session_stats(task_id)
+            session_cost = session_stats.get('total_cost_usd', 0)
+
+            # Actualitzar estadístiques de l'usuari
+            if user_name:
+                update_user_stats(user_name, session_cost, presentations=1)
+
+            # Guardar presentació a la base de dades
+            save_presentation(
+                task_id=task_id,
+                user_name=user_name or "anonymous",
+                chapter_name=chapter_name,
+                group_name=group_name,
+                slides_count=len(plan.slides),
+                cost_usd=session_cost,
+                pptx_path=str(pptx_path)
+            )
+
+            # Completat
+            update_task(
+                task_id,
+                status='completed',
+                progress='Completat!',
+                pptx_path=str(pptx_path),
+                docx_path=None,  # DESACTIVAT
+                slides_count=len(plan.slides),
+                cost_usd=session_cost
+            )
+        _notify_task_change()
 
     except Exception as e:
-        tasks[task_id]['status'] = 'error'
-        tasks[task_id]['error'] = str(e)
-        tasks[task_id]['progress'] = f'Error: {str(e)}'
+        _update_task(task_id, status='error', error=str(e), progress=f'Error: {str(e)}')
 
 
 @app.route('/')
@@ -143,7 +209,7 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Puja un PDF i comença el processament."""
+    """Puja un PDF (multipart) i comença el processament."""
     if 'pdf_file' not in request.files:
         return jsonify({'error': 'No s\'ha seleccionat cap fitxer'}), 400
 
@@ -154,25 +220,14 @@ def upload_file():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Només es permeten fitxers PDF'}), 400
 
-    # Obtenir paràmetres
-    chapter_name = request.form.get('chapter_name', 'KWC00')
-    group_name = request.form.get('group_name', 'GRUP')
-    skip_images = request.form.get('skip_images', 'false') == 'true'
-    user_name = request.form.get('user_name', '').strip()
-
     # Validar nom d'usuari
+    user_name = request.form.get('user_name', '').strip()
     if not user_name:
         return jsonify({'error': 'Has d\'introduir el teu nom'}), 400
 
-    # Registrar usuari
-    register_user(user_name)
-
     # Guardar fitxer
     filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_filename = f"{timestamp}_{filename}"
-    pdf_path = Path(app.config['UPLOAD_FOLDER']) / unique_filename
-    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    pdf_path = _upload_path(filename)
     file.save(str(pdf_path))
 
     # Obtenir API keys (de la request o de la BD)
@@ -181,29 +236,102 @@ def upload_file():
         'google': request.form.get('google_key') or get_api_keys().get('google')
     }
 
+    return _start_task(request.form, user_name, filename, pdf_path, api_keys)
+
+
+@app.route('/upload_raw', methods=['POST'])
+def upload_raw():
+    """
+    Puja un PDF com a cos de la petició (sense multipart) i comença el processament.
+
+    El fitxer s'escriu a disc a blocs directament des de request.stream, sense passar
+    pel parser de formularis. Els paràmetres van a la query string.
+    """
+    filename = secure_filename(request.args.get('filename', ''))
+    if not filename:
+        return jsonify({'error': 'No s\'ha seleccionat cap fitxer'}), 400
+
+    if not allowed_file(filename):
+        return jsonify({'error': 'Només es permeten fitxers PDF'}), 400
+
+    # Validar nom d'usuari
+    user_name = request.args.get('user_name', '').strip()
+    if not user_name:
+        return jsonify({'error': 'Has d\'introduir el teu nom'}), 400
+
+    # Guardar fitxer a blocs d'1 MiB
+    pdf_path = _upload_path(filename)
+    max_size = app.config['MAX_CONTENT_LENGTH']
+    written = 0
+    with open(pdf_path, 'wb') as f:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_size:
+                break
+            f.write(chunk)
+
+    if written == 0 or written > max_size:
+        pdf_path.unlink(missing_ok=True)
+        if written:
+            return jsonify({'error': 'El fitxer és massa gran (màxim 50MB)'}), 413
+        return jsonify({'error': 'No s\'ha seleccionat cap fitxer'}), 400
+
+    api_keys = {
+        'anthropic': get_api_keys().get('anthropic'),
+        'google': get_api_keys().get('google')
+    }
+
+    return _start_task(request.args, user_name, filename, pdf_path, api_keys)
+
+
+def _upload_path(filename):
+    """Retorna un path únic dins la carpeta de pujades per a un fitxer."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_filename = f"{timestamp}_{filename}"
+    pdf_path = Path(app.config['UPLOAD_FOLDER']) / unique_filename
+    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    return pdf_path
+
+
+def _start_task(params, user_name, filename, pdf_path, api_keys):
+    """Registra l'usuari, crea la tasca i l'encua per processar-la en segon pla."""
+    # Obtenir paràmetres
+    chapter_name = params.get('chapter_name', 'KWC00')
+    group_name = params.get('group_name', 'GRUP')
+    skip_images = params.get('skip_images', 'false') == 'true'
+
+    # Registrar usuari
+    register_user(user_name)
+
     # Crear tasca
     task_id = str(uuid.uuid4())
 
     # Crear sessió associada a l'usuari
     create_session_with_user(task_id, user_name)
 
-    tasks[task_id] = {
-        'id': task_id,
-        'status': 'queued',
-        'progress': 'En cua...',
-        'chapter_name': chapter_name,
-        'group_name': group_name,
-        'pdf_filename': filename,
-        'user_name': user_name,
-        'cost_usd': 0
-    }
-
-    # Iniciar processament en segon pla
-    thread = threading.Thread(
-        target=process_presentation,
-        args=(task_id, pdf_path, chapter_name, group_name, skip_images, api_keys, user_name)
+    # Netejar l'estat de tasques antigues abans de crear-ne una de nova
+    purge_old_tasks(max_age_hours=TASK_RETENTION_HOURS, max_tasks=MAX_STORED_TASKS)
+    create_task(
+        task_id,
+        status='queued',
+        progress='En cua...',
+        chapter_name=chapter_name,
+        group_name=group_name,
+        pdf_filename=filename,
+        user_name=user_name,
+        cost_usd=0
     )
-    thread.start()
+
+    # Encuar el processament en segon pla (amb límit per no saturar el servidor)
+    _ensure_workers()
+    try:
+        job_queue.put_nowait((task_id, pdf_path, chapter_name, group_name, skip_images, api_keys, user_name))
+    except queue.Full:
+        delete_task(task_id)
+        return jsonify({'error': 'El servidor està ocupat. Torna-ho a provar d\'aquí uns minuts'}), 503
 
     return jsonify({'task_id': task_id})
 
@@ -211,18 +339,61 @@ def upload_file():
 @app.route('/status/<task_id>')
 def get_status(task_id):
     """Retorna l'estat d'una tasca."""
-    if task_id not in tasks:
+    task = get_task(task_id)
+    if task is None:
         return jsonify({'error': 'Tasca no trobada'}), 404
-    return jsonify(tasks[task_id])
+    return jsonify(task)
+
+
+@app.route('/status/<task_id>/stream')
+def stream_status(task_id):
+    """Envia l'estat d'una tasca cada cop que canvia (Server-Sent Events)."""
+    if get_task(task_id) is None:
+        return jsonify({'error': 'Tasca no trobada'}), 404
+
+    def generate():
+        last_state = None
+        started_at = last_sent_at = time.monotonic()
+        while True:
+            seen_version = _task_version
+            task = get_task(task_id)
+            if task is None:
+                return
+
+            state = json.dumps(task)
+            if state != last_state:
+                last_state = state
+                last_sent_at = time.monotonic()
+                yield f"data: {state}\n\n"
+            elif time.monotonic() - last_sent_at >= SSE_KEEPALIVE_SECONDS:
+                last_sent_at = time.monotonic()
+                yield ": keepalive\n\n"
+
+            if task['status'] in ('completed', 'error') or time.monotonic() - started_at >= SSE_MAX_SECONDS:
+                return
+
+            with task_events:
+                if _task_version == seen_version:
+                    task_events.wait(timeout=SSE_WAIT_SECONDS)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/download/<task_id>/<file_type>')
 def download_file(task_id, file_type):
     """Descarrega el fitxer generat."""
-    if task_id not in tasks:
-        return jsonify({'error': 'Tasca no trobada'}), 404
+    task = get_task(task_id)
+    if task is None:
+        # L'estat de la tasca ja s'ha netejat: buscar la presentació guardada
+        pptx_path = get_presentation_path(task_id)
+        if pptx_path is None:
+            return jsonify({'error': 'Tasca no trobada'}), 404
+        task = {'status': 'completed', 'pptx_path': pptx_path, 'docx_path': None}
 
-    task = tasks[task_id]
     if task['status'] != 'completed':
         return jsonify({'error': 'La tasca encara no ha acabat'}), 400
 
@@ -238,13 +409,28 @@ def download_file(task_id, file_type):
     if not file_path or not Path(file_path).exists():
         return jsonify({'error': 'Fitxer no trobat'}), 404
 
-    return send_file(
+    # conditional=True: suport de Range i respostes 304 per descàrregues repetides
+    response = send_file(
         file_path,
         as_attachment=True,
         download_name=Path(file_path).name,
-        mimetype=mimetype
+        mimetype=mimetype,
+        conditional=True,
+        etag=True,
+        max_age=0
     )
 
+    # Darrere d'nginx, el fitxer l'envia nginx directament (sendfile) via X-Accel-Redirect
+    if X_ACCEL_REDIRECT_PREFIX:
+        sendfile_path = response.headers.pop('X-Sendfile', None)
+        if sendfile_path:
+            relative_path = Path(sendfile_path).resolve().relative_to(OUTPUT_DIR.resolve())
+            response.headers['X-Accel-Redirect'] = (
+                f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(relative_path.as_posix())}"
+            )
+
+    return response
+
 
 # ============================================================================
 # ENDPOINTS PER GESTIÓ D'API KEYS
@@ -376,518 +562,6 @@ def remove_presentation(task_id):
     return jsonify({'error': 'Presentació no trobada'}), 404
 
 
-# Crear directori de templates si no existeix
-templates_dir = Path(__file__).parent / 'templates'
-templates_dir.mkdir(exist_ok=True)
-
-# Template HTML
-INDEX_HTML = '''<!DOCTYPE html>
-<html lang="ca">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>MENAG Presentation Generator</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 40px 20px;
-        }
-
-        .container {
-            max-width: 600px;
-            margin: 0 auto;
-        }
-
-        .card {
-            background: white;
-            border-radius: 20px;
-            padding: 40px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-        }
-
-        h1 {
-            color: #E07A2F;
-            text-align: center;
-            margin-bottom: 10px;
-            font-size: 2em;
-        }
-
-        .subtitle {
-            text-align: center;
-            color: #666;
-            margin-bottom: 20px;
-        }
-
-        .nav {
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        .nav a {
-            color: #E07A2F;
-            text-decoration: none;
-            font-weight: 600;
-            padding: 10px 20px;
-            border-radius: 8px;
-            transition: background 0.3s;
-        }
-        .nav a:hover { background: #fff5ef; }
-        .nav a.active { background: #E07A2F; color: white; }
-
-        .form-group {
-            margin-bottom: 20px;
-        }
-
-        label {
-            display: block;
-            margin-bottom: 8px;
-            color: #333;
-            font-weight: 600;
-        }
-
-        input[type="text"],
-        input[type="file"] {
-            width: 100%;
-            padding: 12px 15px;
-            border: 2px solid #ddd;
-            border-radius: 10px;
-            font-size: 16px;
-            transition: border-color 0.3s;
-        }
-
-        input[type="text"]:focus,
-        input[type="file"]:focus {
-            outline: none;
-            border-color: #E07A2F;
-        }
-
-        .file-upload {
-            border: 2px dashed #E07A2F;
-            border-radius: 10px;
-            padding: 30px;
-            text-align: center;
-            cursor: pointer;
-            transition: background 0.3s;
-        }
-
-        .file-upload:hover {
-            background: #fff5ef;
-        }
-
-        .file-upload input {
-            display: none;
-        }
-
-        .file-upload-label {
-            color: #E07A2F;
-            font-weight: 600;
-        }
-
-        .file-name {
-            margin-top: 10px;
-            color: #666;
-            font-size: 14px;
-        }
-
-        .checkbox-group {
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-
-        .checkbox-group input {
-            width: 20px;
-            height: 20px;
-            accent-color: #E07A2F;
-        }
-
-        button {
-            width: 100%;
-            padding: 15px;
-            background: linear-gradient(135deg, #E07A2F 0%, #c96a25 100%);
-            color: white;
-            border: none;
-            border-radius: 10px;
-            font-size: 18px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }
-
-        button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 20px rgba(224, 122, 47, 0.4);
-        }
-
-        button:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-            box-shadow: none;
-        }
-
-        .progress-container {
-            display: none;
-            margin-top: 30px;
-        }
-
-        .progress-bar {
-            height: 10px;
-            background: #eee;
-            border-radius: 5px;
-            overflow: hidden;
-            margin-bottom: 10px;
-        }
-
-        .progress-fill {
-            height: 100%;
-            background: linear-gradient(90deg, #E07A2F, #f5a623);
-            width: 0%;
-            transition: width 0.5s;
-            animation: pulse 1.5s infinite;
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.7; }
-        }
-
-        .progress-text {
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-        }
-
-        .results {
-            display: none;
-            margin-top: 30px;
-            padding: 20px;
-            background: #f0fff0;
-            border-radius: 10px;
-            border: 2px solid #4CAF50;
-        }
-
-        .results h3 {
-            color: #4CAF50;
-            margin-bottom: 15px;
-            text-align: center;
-        }
-
-        .download-buttons {
-            display: flex;
-            gap: 10px;
-        }
-
-        .download-btn {
-            flex: 1;
-            padding: 12px;
-            border-radius: 8px;
-            text-decoration: none;
-            text-align: center;
-            font-weight: 600;
-            transition: transform 0.2s;
-        }
-
-        .download-btn:hover {
-            transform: translateY(-2px);
-        }
-
-        .download-pptx {
-            background: #E07A2F;
-            color: white;
-        }
-
-        .download-docx {
-            background: #2196F3;
-            color: white;
-        }
-
-        .error {
-            display: none;
-            margin-top: 20px;
-            padding: 15px;
-            background: #ffebee;
-            border-radius: 10px;
-            border: 2px solid #f44336;
-            color: #c62828;
-        }
-
-        .info-box {
-            background: #e3f2fd;
-            border-radius: 10px;
-            padding: 15px;
-            margin-bottom: 20px;
-            font-size: 14px;
-            color: #1565c0;
-        }
-
-        .row {
-            display: flex;
-            gap: 15px;
-        }
-
-        .row .form-group {
-            flex: 1;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="card">
-            <h1>MENAG Generator</h1>
-            <p class="subtitle">Genera presentacions i xuletes automaticament</p>
-
-            <nav class="nav">
-                <a href="/" class="active">Generador</a>
-                <a href="/downloads">Descarregues</a>
-                <a href="/stats">Estadistiques</a>
-                <a href="/settings">Configuracio</a>
-            </nav>
-
-            <div class="info-box">
-                Puja el PDF del capítol del llibre Koontz i obtindràs un PowerPoint
-                amb ~20 diapositives i un Word amb la xuleta per estudiar.
-            </div>
-
-            <form id="uploadForm">
-                <div class="form-group">
-                    <label>El teu nom *</label>
-                    <input type="text" id="userName" name="user_name"
-                           placeholder="Introdueix el teu nom" required>
-                </div>
-
-                <div class="form-group">
-                    <label>PDF del Capitol</label>
-                    <div class="file-upload" onclick="document.getElementById('pdfFile').click()">
-                        <input type="file" id="pdfFile" name="pdf_file" accept=".pdf" required>
-                        <span class="file-upload-label">Clica o arrossega el PDF aqui</span>
-                        <div class="file-name" id="fileName"></div>
-                    </div>
-                </div>
-
-                <div class="row">
-                    <div class="form-group">
-                        <label>Nom del Capitol</label>
-                        <input type="text" id="chapterName" name="chapter_name"
-                               placeholder="ex: KWC04" value="KWC" required>
-                    </div>
-
-                    <div class="form-group">
-                        <label>Nom del Grup</label>
-                        <input type="text" id="groupName" name="group_name"
-                               placeholder="ex: GRUPG" value="GRUPG" required>
-                    </div>
-                </div>
-
-                <div class="form-group">
-                    <div class="checkbox-group">
-                        <input type="checkbox" id="skipImages" name="skip_images">
-                        <label for="skipImages" style="margin: 0; font-weight: normal;">
-                            Saltar generació d'imatges (més ràpid)
-                        </label>
-                    </div>
-                </div>
-
-                <button type="submit" id="submitBtn">Generar Presentació</button>
-            </form>
-
-            <div class="progress-container" id="progressContainer">
-                <div class="progress-bar">
-                    <div class="progress-fill" id="progressFill"></div>
-                </div>
-                <p class="progress-text" id="progressText">Processant...</p>
-            </div>
-
-            <div class="results" id="results">
-                <h3>Presentació generada!</h3>
-                <p style="text-align: center; margin-bottom: 15px;" id="resultsInfo"></p>
-                <div class="download-buttons">
-                    <a href="#" class="download-btn download-pptx" id="downloadPptx">
-                        Descarregar PPT
-                    </a>
-                    <a href="#" class="download-btn download-docx" id="downloadDocx">
-                        Descarregar Xuleta
-                    </a>
-                </div>
-            </div>
-
-            <div class="error" id="errorBox"></div>
-        </div>
-    </div>
-
-    <script>
-        const form = document.getElementById('uploadForm');
-        const pdfFile = document.getElementById('pdfFile');
-        const fileName = document.getElementById('fileName');
-        const submitBtn = document.getElementById('submitBtn');
-        const progressContainer = document.getElementById('progressContainer');
-        const progressFill = document.getElementById('progressFill');
-        const progressText = document.getElementById('progressText');
-        const results = document.getElementById('results');
-        const resultsInfo = document.getElementById('resultsInfo');
-        const errorBox = document.getElementById('errorBox');
-
-        // Funcio per mostrar resultats completats
-        function showCompletedResults(taskData) {
-            progressContainer.style.display = 'none';
-            results.style.display = 'block';
-            const cost = taskData.cost_usd ? parseFloat(taskData.cost_usd).toFixed(4) : '0.0000';
-            resultsInfo.innerHTML = `${taskData.slides_count} diapositives generades<br><span style="color:#E07A2F; font-weight:bold;">Cost: $${cost}</span>`;
-            document.getElementById('downloadPptx').href = `/download/${taskData.task_id}/pptx`;
-            document.getElementById('downloadDocx').href = `/download/${taskData.task_id}/docx`;
-            submitBtn.disabled = false;
-        }
-
-        // Funcio per fer polling d'una tasca
-        function pollTask(task_id) {
-            progressContainer.style.display = 'block';
-            results.style.display = 'none';
-            submitBtn.disabled = true;
-            let progress = 10;
-
-            const pollInterval = setInterval(async () => {
-                try {
-                    const statusResponse = await fetch(`/status/${task_id}`);
-                    if (!statusResponse.ok) {
-                        // Tasca no trobada (pot ser que el servidor s'hagi reiniciat)
-                        clearInterval(pollInterval);
-                        localStorage.removeItem('active_task');
-                        localStorage.removeItem('completed_task');
-                        progressContainer.style.display = 'none';
-                        submitBtn.disabled = false;
-                        return;
-                    }
-                    const status = await statusResponse.json();
-
-                    progressText.textContent = status.progress;
-
-                    if (status.status === 'processing' || status.status === 'queued') {
-                        progress = Math.min(progress + 2, 90);
-                        progressFill.style.width = progress + '%';
-                    } else if (status.status === 'completed') {
-                        clearInterval(pollInterval);
-                        localStorage.removeItem('active_task');
-                        progressFill.style.width = '100%';
-
-                        // Guardar tasca completada per poder recuperar-la
-                        const completedData = {
-                            task_id: task_id,
-                            slides_count: status.slides_count,
-                            cost_usd: status.cost_usd,
-                            timestamp: Date.now()
-                        };
-                        localStorage.setItem('completed_task', JSON.stringify(completedData));
-
-                        showCompletedResults(completedData);
-                    } else if (status.status === 'error') {
-                        clearInterval(pollInterval);
-                        localStorage.removeItem('active_task');
-                        progressContainer.style.display = 'none';
-                        errorBox.style.display = 'block';
-                        errorBox.textContent = status.error || 'Error desconegut';
-                        submitBtn.disabled = false;
-                    }
-                } catch (e) {
-                    // Error de xarxa, continuar intentant
-                    console.log('Error polling:', e);
-                }
-            }, 2000);
-        }
-
-        // Al carregar la pagina, comprovar tasques
-        const activeTask = localStorage.getItem('active_task');
-        const completedTask = localStorage.getItem('completed_task');
-
-        if (activeTask) {
-            // Hi ha una tasca en proces
-            console.log('Recuperant tasca activa:', activeTask);
-            pollTask(activeTask);
-        } else if (completedTask) {
-            // Hi ha una tasca completada recent (menys de 24h)
-            const taskData = JSON.parse(completedTask);
-            const hoursSinceCompletion = (Date.now() - taskData.timestamp) / (1000 * 60 * 60);
-            if (hoursSinceCompletion < 24) {
-                console.log('Mostrant tasca completada:', taskData.task_id);
-                showCompletedResults(taskData);
-            } else {
-                // Massa antiga, esborrar
-                localStorage.removeItem('completed_task');
-            }
-        }
-
-        pdfFile.addEventListener('change', function() {
-            if (this.files.length > 0) {
-                fileName.textContent = this.files[0].name;
-            }
-        });
-
-        form.addEventListener('submit', async function(e) {
-            e.preventDefault();
-
-            // Netejar tasca anterior
-            localStorage.removeItem('completed_task');
-
-            // Reset UI
-            progressContainer.style.display = 'block';
-            results.style.display = 'none';
-            errorBox.style.display = 'none';
-            submitBtn.disabled = true;
-            progressFill.style.width = '10%';
-
-            // Preparar dades
-            const formData = new FormData();
-            formData.append('pdf_file', pdfFile.files[0]);
-            formData.append('user_name', document.getElementById('userName').value);
-            formData.append('chapter_name', document.getElementById('chapterName').value);
-            formData.append('group_name', document.getElementById('groupName').value);
-            formData.append('skip_images', document.getElementById('skipImages').checked);
-
-            try {
-                // Pujar fitxer
-                const uploadResponse = await fetch('/upload', {
-                    method: 'POST',
-                    body: formData
-                });
-
-                if (!uploadResponse.ok) {
-                    const error = await uploadResponse.json();
-                    throw new Error(error.error || 'Error pujant el fitxer');
-                }
-
-                const { task_id } = await uploadResponse.json();
-
-                // Guardar task_id a localStorage per recuperar-lo si es refresca
-                localStorage.setItem('active_task', task_id);
-
-                // Iniciar polling
-                pollTask(task_id);
-
-            } catch (error) {
-                progressContainer.style.display = 'none';
-                errorBox.style.display = 'block';
-                errorBox.textContent = error.message;
-                submitBtn.disabled = false;
-            }
-        });
-    </script>
-</body>
-</html>
-'''
-
-# Guardar template
-with open(templates_dir / 'index.html', 'w', encoding='utf-8') as f:
-    f.write(INDEX_HTML)
-
-
 if __name__ == '__main__':
     print("=" * 60)
     print("MENAG PRESENTATION GENERATOR - Web Interface")
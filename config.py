@@ -23,6 +23,20 @@ IMAGES_GENERATED_DIR = CACHE_DIR / "images" / "generated"
 # Configuració d'extracció d'imatges
 MIN_IMAGE_WIDTH = 200  # píxels
 MIN_IMAGE_HEIGHT = 200  # píxels
+MIN_DESCRIBE_PIXELS = 128 * 128  # Imatges més petites no s'envien a Gemini (icones, logos)
+MAX_DESCRIBE_ASPECT_RATIO = 10  # Ni les més allargades (franges i separadors decoratius)
+IMAGE_BATCH_SIZE = 6  # Imatges descrites per crida a Gemini
+IMAGE_GENERATE_WORKERS = int(os.getenv("IMAGE_GENERATE_WORKERS", "5"))  # Imatges generades en paral·lel (el ritme el controla el limitador de Google)
+IMAGE_DESCRIBE_MAX_SIDE = 1024  # Les imatges més grans es redueixen (i passen a JPEG) abans d'enviar-les a Gemini
+IMAGE_DESCRIBE_JPEG_QUALITY = 85
+IMAGE_BATCH_MAX_BYTES = 14 * 1024 * 1024  # Bytes d'imatge per crida (en base64 han de quedar per sota dels 20 MB de Gemini)
+# Crides a Gemini en paral·lel per descriure imatges. Són fils i no processos:
+# el temps es passa esperant la xarxa (sense el GIL) i google_limiter, compartit
+# entre fils, és el que controla el ritme del proveïdor
+IMAGE_DESCRIBE_WORKERS = int(os.getenv("IMAGE_DESCRIBE_WORKERS", "3"))
+IMAGE_EXTRACT_WORKERS = int(os.getenv("IMAGE_EXTRACT_WORKERS", str(min(os.cpu_count() or 1, 4))))  # Processos per extreure imatges (1 = sense paral·lelisme)
+IMAGE_EXTRACT_MIN_PAGES = 32  # Pàgines mínimes perquè compensi arrencar processos
+IMAGE_EXTRACT_PAGES_PER_TASK = 8  # Pàgines que processa cada tasca del pool
 
 # Configuració de models
 CLAUDE_MODEL = "claude-opus-4-5-20251101"  # Opus 4.5 per estructurar i orquestrar
@@ -32,6 +46,20 @@ GEMINI_IMAGE_MODEL = "gemini-3-pro-image-preview"  # Nano Banana per generar ima
 # Configuració d'API
 MAX_TOKENS = 32000  # Tokens màxims per evitar truncament (augmentat per presentacions llargues)
 API_TIMEOUT = 600  # Timeout en segons (10 minuts per presentacions grans)
+# Límits de velocitat per proveïdor (peticions i tokens per minut)
+ANTHROPIC_RPM = int(os.getenv("ANTHROPIC_RPM", "50"))
+ANTHROPIC_TPM = int(os.getenv("ANTHROPIC_TPM", "80000"))
+GOOGLE_RPM = int(os.getenv("GOOGLE_RPM", "60"))
+GOOGLE_TPM = int(os.getenv("GOOGLE_TPM", "100000"))
+GEMINI_IMAGE_RPM = int(os.getenv("GEMINI_IMAGE_RPM", "40"))  # Generació d'imatges (quota pròpia del model; 40 = una cada 1,5 s)
+BATCH_POLL_INTERVAL = int(os.getenv("BATCH_POLL_INTERVAL", "30"))  # Segons entre consultes de l'estat d'un lot (Message Batches)
+BATCH_MAX_WAIT = int(os.getenv("BATCH_MAX_WAIT", "3600"))  # Segons màxims d'espera d'un lot: després es cancel·la i es fan crides directes
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))  # Validesa de les respostes guardades (segons)
+
+# Configuració del servidor web
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))  # Presentacions processades alhora
+MAX_QUEUED_TASKS = int(os.getenv("MAX_QUEUED_TASKS", "20"))  # Tasques en cua abans de rebutjar-ne
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")  # Ruta interna d'nginx per OUTPUT_DIR (buit = Flask envia el fitxer)
 
 # Configuració de presentació
 TARGET_SLIDES = 20
@@ -2,10 +2,17 @@
 Base de dades per gestionar configuració i ús del sistema.
 Utilitza SQLite per persistència.
 """
+import atexit
+import os
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, List
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
 import json
 
 DB_PATH = Path(__file__).parent / "data" / "menag.db"
@@ -20,14 +27,169 @@ MODEL_PRICING = {
     "gemini-3-pro-image-preview": {"input": 0.0, "output": 0.0, "per_image": 0.025},
 }
 
+# Multiplicadors del preu d'entrada per la cache de prompts d'Anthropic
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+# Les peticions enviades per lots (Message Batches) paguen la meitat
+BATCH_PRICE_MULTIPLIER = 0.5
+
+# Preus per token precalculats: (entrada, escriptura a cache, lectura de cache, sortida, per imatge)
+_TOKEN_PRICES = {
+    model: (
+        pricing.get("input", 0) / 1_000_000,
+        pricing.get("input", 0) * CACHE_WRITE_MULTIPLIER / 1_000_000,
+        pricing.get("input", 0) * CACHE_READ_MULTIPLIER / 1_000_000,
+        pricing.get("output", 0) / 1_000_000,
+        pricing.get("per_image", 0)
+    )
+    for model, pricing in MODEL_PRICING.items()
+}
+_NO_PRICES = (0, 0, 0, 0, 0)
+
+# Connexió persistent per fil (es reutilitza entre crides)
+_local = threading.local()
+_connections = weakref.WeakSet()  # Per tancar-les en sortir (les dels fils acabats es tanquen soles)
+_connections_lock = threading.Lock()
+
+# PRAGMAs per connexió (journal_mode=WAL és persistent i es fixa a init_db)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",   # Amb WAL, sense fsync a cada commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",    # 64 MiB de cache de pàgines
+    "PRAGMA mmap_size=268435456",  # 256 MiB de lectures amb mmap
+    "PRAGMA busy_timeout=5000",    # Esperar fins a 5 s si un altre procés escriu
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_spill=OFF",      # No escriure pàgines brutes a disc abans del COMMIT
+)
+
+
+class _PooledConnection:
+    """
+    Connexió persistent del fil.
+
+    close() no tanca la connexió (es reutilitza a la següent crida) i commit()
+    s'ajorna fins al final del bloc quan hi ha una transaction() activa.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.pid = os.getpid()
+        self.transaction_depth = 0
+
+    def cursor(self) -> sqlite3.Cursor:
+        return self._conn.cursor()
+
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self._conn.execute(sql, parameters)
+
+    def commit(self):
+        if self.transaction_depth == 0:
+            self._conn.commit()
+
+    def close(self):
+        pass
+
+
+def _open_connection() -> sqlite3.Connection:
+    """Obre una connexió nova amb els PRAGMAs del projecte."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Files accessibles per nom: dict(row)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _connect() -> _PooledConnection:
+    """Retorna la connexió persistent del fil actual (l'obre el primer cop)."""
+    if not _initialized:
+        init_db()
+
+    pooled = getattr(_local, "conn", None)
+    if pooled is None or pooled.pid != os.getpid():
+        # Primer ús en aquest fil (o procés fill després d'un fork)
+        pooled = _PooledConnection(_open_connection())
+        _local.conn = pooled
+        with _connections_lock:
+            _connections.add(pooled)
+    elif pooled.transaction_depth == 0 and pooled._conn.in_transaction:
+        # Una crida anterior ha fallat a mitja escriptura: descartar-la
+        pooled._conn.rollback()
+    return pooled
+
+
+@contextmanager
+def transaction():
+    """
+    Agrupa totes les escriptures del fil actual en una sola transacció.
+
+    Les funcions d'aquest mòdul cridades dins del bloc comparteixen la mateixa
+    connexió i es confirmen amb un únic COMMIT en sortir (o ROLLBACK si hi ha error).
+    """
+    pooled = _connect()
+    if pooled.transaction_depth > 0:
+        # Transacció niuada: s'afegeix a l'exterior
+        pooled.transaction_depth += 1
+        try:
+            yield
+        finally:
+            pooled.transaction_depth -= 1
+        return
+
+    pooled.execute("BEGIN IMMEDIATE")
+    pooled.transaction_depth = 1
+    try:
+        yield
+        pooled._conn.commit()
+    except BaseException:
+        pooled._conn.rollback()
+        raise
+    finally:
+        pooled.transaction_depth = 0
+
+
+def _close_all():
+    """Tanca les connexions persistents en aturar el procés."""
+    with _connections_lock:
+        for pooled in list(_connections):
+            if pooled.pid == os.getpid():
+                pooled._conn.close()
+        _connections.clear()
+
+
+atexit.register(_close_all)
+
+
+# INSERT ... RETURNING disponible a partir de SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# La BD s'inicialitza al primer ús (no en importar el mòdul), un sol cop per procés
+_initialized = False
+_init_lock = threading.Lock()
+
 
 def init_db():
     """Inicialitza la base de dades."""
+    global _initialized
+    if _initialized:
+        return
+
+    with _init_lock:
+        if not _initialized:
+            _create_schema()
+            _initialized = True
+
+
+def _create_schema():
+    """Crea les taules i els índexs que falten."""
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = _open_connection()
     cursor = conn.cursor()
 
+    # WAL: les lectures (/status, /api/stats) no esperen les escriptures dels workers.
+    # És persistent: a partir d'ara apareixen els fitxers menag.db-wal i menag.db-shm
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # Taula de configuració (API keys)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS config (
@@ -92,23 +254,107 @@ def init_db():
         )
     """)
 
+    # Taula de tasques en curs (estat compartit entre workers del servidor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            progress TEXT,
+            error TEXT,
+            chapter_name TEXT,
+            group_name TEXT,
+            pdf_filename TEXT,
+            user_name TEXT,
+            pptx_path TEXT,
+            docx_path TEXT,
+            slides_count INTEGER,
+            cost_usd REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Cache de respostes dels models (clau = hash exacte de l'entrada)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            namespace TEXT NOT NULL,
+            cache_key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (namespace, cache_key)
+        )
+    """)
+
+    # Totals acumulats per model (s'actualitzen a cada log_usage)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_totals (
+            model TEXT PRIMARY KEY,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            images_generated INTEGER DEFAULT 0,
+            cost_usd REAL DEFAULT 0,
+            calls INTEGER DEFAULT 0
+        )
+    """)
+
+    # Omplir els totals a partir de l'historial si la taula és nova
+    cursor.execute("SELECT 1 FROM usage_totals LIMIT 1")
+    if cursor.fetchone() is None:
+        cursor.execute("""
+            INSERT INTO usage_totals (model, input_tokens, output_tokens, images_generated, cost_usd, calls)
+            SELECT model, SUM(input_tokens), SUM(output_tokens), SUM(images_generated), SUM(cost_usd), COUNT(*)
+            FROM usage
+            GROUP BY model
+        """)
+
+    # Índexs per les consultes d'estadístiques i presentacions
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_session ON usage(session_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usage_created ON usage(created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_name, created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pres_user ON presentations(user_name, deleted, created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pres_created ON presentations(deleted, created_at DESC)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pres_task ON presentations(task_id) WHERE deleted = 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks(updated_at)")
+
+    # Estadístiques per al planificador (només el primer cop)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        cursor.execute("ANALYZE")
+
     conn.commit()
     conn.close()
 
 
+# Cache en memòria de la taula config (canvia poc i es llegeix a cada petició)
+CONFIG_CACHE_TTL = 60.0  # segons
+_config_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+_config_cache_lock = threading.Lock()
+
+
 def get_config(key: str) -> Optional[str]:
     """Obté un valor de configuració."""
-    conn = sqlite3.connect(DB_PATH)
+    now = time.monotonic()
+    with _config_cache_lock:
+        cached = _config_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    conn = _connect()
     cursor = conn.cursor()
     cursor.execute("SELECT value FROM config WHERE key = ?", (key,))
     result = cursor.fetchone()
     conn.close()
-    return result[0] if result else None
+
+    value = result[0] if result else None
+    if conn.transaction_depth == 0:
+        with _config_cache_lock:
+            _config_cache[key] = (now + CONFIG_CACHE_TTL, value)
+    return value
 
 
 def set_config(key: str, value: str):
     """Estableix un valor de configuració."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     cursor.execute("""
         INSERT OR REPLACE INTO config (key, value, updated_at)
@@ -117,14 +363,25 @@ def set_config(key: str, value: str):
     conn.commit()
     conn.close()
 
+    with _config_cache_lock:
+        if conn.transaction_depth == 0:
+            _config_cache[key] = (time.monotonic() + CONFIG_CACHE_TTL, value)
+        else:
+            # Encara no confirmat (pot fer ROLLBACK): que es torni a llegir després
+            _config_cache.pop(key, None)
+
+
+def invalidate_config_cache():
+    """Buida la cache de configuració (ex: després de canviar la BD des de fora)."""
+    with _config_cache_lock:
+        _config_cache.clear()
+
 
 def get_api_keys() -> Dict[str, str]:
-    """Obté les API keys configurades."""
-    anthropic_key = get_config("anthropic_api_key") or ""
-    google_key = get_config("google_api_key") or ""
+    """Obté les API keys configurades (ja es guarden netes per set_api_keys)."""
     return {
-        "anthropic": anthropic_key.strip() if anthropic_key else "",
-        "google": google_key.strip() if google_key else ""
+        "anthropic": get_config("anthropic_api_key") or "",
+        "google": get_config("google_api_key") or ""
     }
 
 
@@ -135,22 +392,94 @@ def set_api_keys(anthropic_key: str = None, google_key: str = None):
         anthropic_key = anthropic_key.strip()
         if anthropic_key:  # Només guardar si no és buit
             set_config("anthropic_api_key", anthropic_key)
+            set_config("anthropic_api_key_valid", _key_valid_flag(anthropic_key))
     if google_key is not None:
         # Netejar espais en blanc i validar
         google_key = google_key.strip()
         if google_key:  # Només guardar si no és buit
             set_config("google_api_key", google_key)
+            set_config("google_api_key_valid", _key_valid_flag(google_key))
 
 
 def has_valid_keys() -> Dict[str, bool]:
     """Comprova si les API keys estan configurades."""
-    keys = get_api_keys()
     return {
-        "anthropic": bool(keys["anthropic"] and len(keys["anthropic"]) > 10),
-        "google": bool(keys["google"] and len(keys["google"]) > 10)
+        "anthropic": _is_key_valid("anthropic"),
+        "google": _is_key_valid("google")
     }
 
 
+def _key_valid_flag(key: str) -> str:
+    """Valida una API key en guardar-la ("1" si sembla vàlida)."""
+    return "1" if len(key) > 10 else "0"
+
+
+def _is_key_valid(provider: str) -> bool:
+    """Llegeix el flag de validesa d'una API key."""
+    flag = get_config(f"{provider}_api_key_valid")
+    if flag is None:
+        # Keys guardades abans d'existir el flag
+        flag = _key_valid_flag(get_config(f"{provider}_api_key") or "")
+    return flag == "1"
+
+
+# Consultes del registre d'ús (constants per reutilitzar el statement cache de sqlite3)
+_SQL_INSERT_USAGE = """
+    INSERT INTO usage (session_id, model, input_tokens, output_tokens,
+                      images_generated, cost_usd, operation, chapter_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPSERT_SESSION = """
+    INSERT INTO sessions (id, total_cost_usd, presentations_generated)
+    VALUES (?, ?, 0)
+    ON CONFLICT(id) DO UPDATE SET
+    total_cost_usd = total_cost_usd + ?
+"""
+
+_SQL_UPSERT_USAGE_TOTALS = """
+    INSERT INTO usage_totals (model, input_tokens, output_tokens, images_generated, cost_usd, calls)
+    VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT(model) DO UPDATE SET
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    images_generated = images_generated + excluded.images_generated,
+    cost_usd = cost_usd + excluded.cost_usd,
+    calls = calls + 1
+"""
+
+
+# Últimes operacions registrades (les mostra el dashboard sense consultar la BD).
+# Es carreguen de la BD el primer cop; cada procés veu les que registra ell mateix.
+RECENT_OPS_SIZE = 10
+_recent_ops = deque(maxlen=RECENT_OPS_SIZE)
+_recent_ops_lock = threading.Lock()
+_recent_ops_primed = False
+
+
+def _prime_recent_ops():
+    """Carrega les últimes operacions de la BD (cal tenir _recent_ops_lock)."""
+    global _recent_ops_primed
+    if _recent_ops_primed:
+        return
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT model, operation, chapter_name, input_tokens, output_tokens,
+               images_generated, cost_usd, created_at
+        FROM usage
+        ORDER BY created_at DESC
+        LIMIT ?
+    """, (RECENT_OPS_SIZE,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    # Les que ja hi ha (registrades abans de carregar) són les més noves
+    _recent_ops.extend(dict(row) for row in rows)
+    _recent_ops_primed = True
+
+
 def log_usage(
     session_id: str,
     model: str,
@@ -158,44 +487,104 @@ def log_usage(
     output_tokens: int = 0,
     images_generated: int = 0,
     operation: str = "",
-    chapter_name: str = ""
+    chapter_name: str = "",
+    cache_write_tokens: int = 0,
+    cache_read_tokens: int = 0,
+    batch: bool = False
 ):
     """Registra l'ús de tokens i calcula el cost."""
-    pricing = MODEL_PRICING.get(model, {"input": 0, "output": 0, "per_image": 0})
-
-    # Calcular cost
-    cost = (input_tokens * pricing.get("input", 0) / 1_000_000 +
-            output_tokens * pricing.get("output", 0) / 1_000_000 +
-            images_generated * pricing.get("per_image", 0))
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Inserir registre d'ús
-    cursor.execute("""
-        INSERT INTO usage (session_id, model, input_tokens, output_tokens,
-                          images_generated, cost_usd, operation, chapter_name)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (session_id, model, input_tokens, output_tokens, images_generated,
-          cost, operation, chapter_name))
-
-    # Actualitzar o crear sessió
-    cursor.execute("""
-        INSERT INTO sessions (id, total_cost_usd, presentations_generated)
-        VALUES (?, ?, 0)
-        ON CONFLICT(id) DO UPDATE SET
-        total_cost_usd = total_cost_usd + ?
-    """, (session_id, cost, cost))
-
-    conn.commit()
-    conn.close()
+    return log_usage_batch([{
+        "session_id": session_id,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "images_generated": images_generated,
+        "operation": operation,
+        "chapter_name": chapter_name,
+        "cache_write_tokens": cache_write_tokens,
+        "cache_read_tokens": cache_read_tokens,
+        "batch": batch
+    }])[0]
+
+
+def log_usage_batch(entries: List[Dict]) -> List[float]:
+    """
+    Registra diversos usos en una sola transacció.
+
+    Args:
+        entries: Diccionaris amb els mateixos camps que els arguments de log_usage.
+
+    Returns:
+        Cost de cada entrada, en el mateix ordre.
+    """
+    costs = []
+    usage_rows = []
+    session_rows = []
+    totals_rows = []
+
+    for entry in entries:
+        input_tokens = entry.get("input_tokens", 0)
+        output_tokens = entry.get("output_tokens", 0)
+        images_generated = entry.get("images_generated", 0)
+        cache_write_tokens = entry.get("cache_write_tokens", 0)
+        cache_read_tokens = entry.get("cache_read_tokens", 0)
+        input_price, cache_write_price, cache_read_price, output_price, image_price = (
+            _TOKEN_PRICES.get(entry["model"], _NO_PRICES)
+        )
 
-    return cost
+        # Calcular cost (escriure a la cache de prompts costa més, llegir-ne molt menys)
+        cost = (input_tokens * input_price +
+                cache_write_tokens * cache_write_price +
+                cache_read_tokens * cache_read_price +
+                output_tokens * output_price +
+                images_generated * image_price)
+        if entry.get("batch"):
+            cost *= BATCH_PRICE_MULTIPLIER
+        costs.append(cost)
+
+        usage_rows.append((
+            entry["session_id"], entry["model"],
+            input_tokens + cache_write_tokens + cache_read_tokens, output_tokens,
+            images_generated, cost, entry.get("operation", ""), entry.get("chapter_name", "")
+        ))
+        session_rows.append((entry["session_id"], cost, cost))
+        totals_rows.append((entry["model"], usage_rows[-1][2], output_tokens, images_generated, cost))
+
+    if not entries:
+        return costs
+
+    # Carregar les operacions recents abans d'inserir (per no duplicar les noves)
+    with _recent_ops_lock:
+        _prime_recent_ops()
+
+    # Inserir registres d'ús i actualitzar sessions i totals per model
+    with transaction():
+        cursor = _connect().cursor()
+        cursor.executemany(_SQL_INSERT_USAGE, usage_rows)
+        cursor.executemany(_SQL_UPSERT_SESSION, session_rows)
+        cursor.executemany(_SQL_UPSERT_USAGE_TOTALS, totals_rows)
+
+    # Guardar també a les operacions recents en memòria
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    with _recent_ops_lock:
+        for row in usage_rows:
+            _recent_ops.appendleft({
+                "model": row[1],
+                "operation": row[6],
+                "chapter_name": row[7],
+                "input_tokens": row[2],
+                "output_tokens": row[3],
+                "images_generated": row[4],
+                "cost_usd": row[5],
+                "created_at": created_at
+            })
+
+    return costs
 
 
 def increment_presentations(session_id: str):
     """Incrementa el comptador de presentacions d'una sessió."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
     cursor.execute("""
         UPDATE sessions SET presentations_generated = presentations_generated + 1
@@ -207,7 +596,7 @@ def increment_presentations(session_id: str):
 
 def get_session_stats(session_id: str) -> Dict:
     """Obté les estadístiques d'una sessió."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     # Stats generals
@@ -224,10 +613,10 @@ def get_session_stats(session_id: str) -> Dict:
     # Detall per model
     cursor.execute("""
         SELECT model,
-               SUM(input_tokens) as total_input,
-               SUM(output_tokens) as total_output,
-               SUM(images_generated) as total_images,
-               SUM(cost_usd) as total_cost
+               SUM(input_tokens) as input_tokens,
+               SUM(output_tokens) as output_tokens,
+               SUM(images_generated) as images_generated,
+               SUM(cost_usd) as cost_usd
         FROM usage WHERE session_id = ?
         GROUP BY model
     """, (session_id,))
@@ -237,62 +626,33 @@ def get_session_stats(session_id: str) -> Dict:
 
     return {
         "exists": True,
-        "total_cost_usd": session[0],
-        "presentations_generated": session[1],
-        "created_at": session[2],
-        "by_model": [
-            {
-                "model": row[0],
-                "input_tokens": row[1],
-                "output_tokens": row[2],
-                "images_generated": row[3],
-                "cost_usd": row[4]
-            }
-            for row in by_model
-        ]
+        **dict(session),
+        "by_model": [dict(row) for row in by_model]
     }
 
 
 def get_global_stats() -> Dict:
     """Obté estadístiques globals del sistema."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
-    # Total global
-    cursor.execute("""
-        SELECT
-            COUNT(DISTINCT session_id) as total_sessions,
-            SUM(input_tokens) as total_input,
-            SUM(output_tokens) as total_output,
-            SUM(images_generated) as total_images,
-            SUM(cost_usd) as total_cost
-        FROM usage
-    """)
-    total = cursor.fetchone()
-
-    # Per model
+    # Per model (totals acumulats, sense recórrer la taula usage)
     cursor.execute("""
-        SELECT model,
-               SUM(input_tokens) as total_input,
-               SUM(output_tokens) as total_output,
-               SUM(images_generated) as total_images,
-               SUM(cost_usd) as total_cost,
-               COUNT(*) as calls
-        FROM usage
-        GROUP BY model
-        ORDER BY total_cost DESC
+        SELECT model, input_tokens, output_tokens, images_generated, cost_usd, calls as api_calls
+        FROM usage_totals
+        ORDER BY cost_usd DESC
     """)
     by_model = cursor.fetchall()
 
-    # Últimes 10 operacions
-    cursor.execute("""
-        SELECT model, operation, chapter_name, input_tokens, output_tokens,
-               images_generated, cost_usd, created_at
-        FROM usage
-        ORDER BY created_at DESC
-        LIMIT 10
-    """)
-    recent = cursor.fetchall()
+    # Sessions amb ús (recorre només l'índex idx_usage_session)
+    cursor.execute("SELECT COUNT(DISTINCT session_id) FROM usage")
+    total_sessions = cursor.fetchone()[0]
+
+
+    # Últimes 10 operacions (en memòria)
+    with _recent_ops_lock:
+        _prime_recent_ops()
+        recent = list(_recent_ops)
 
     # Presentacions totals
     cursor.execute("SELECT SUM(presentations_generated) FROM sessions")
@@ -300,63 +660,65 @@ def get_global_stats() -> Dict:
 
     conn.close()
 
+    by_model = [dict(row) for row in by_model]
+
     return {
-        "total_sessions": total[0] or 0,
-        "total_input_tokens": total[1] or 0,
-        "total_output_tokens": total[2] or 0,
-        "total_images_generated": total[3] or 0,
-        "total_cost_usd": total[4] or 0,
+        "total_sessions": total_sessions or 0,
+        "total_input_tokens": sum(row["input_tokens"] or 0 for row in by_model),
+        "total_output_tokens": sum(row["output_tokens"] or 0 for row in by_model),
+        "total_images_generated": sum(row["images_generated"] or 0 for row in by_model),
+        "total_cost_usd": sum(row["cost_usd"] or 0 for row in by_model),
         "total_presentations": total_presentations,
-        "by_model": [
-            {
-                "model": row[0],
-                "input_tokens": row[1],
-                "output_tokens": row[2],
-                "images_generated": row[3],
-                "cost_usd": row[4],
-                "api_calls": row[5]
-            }
-            for row in by_model
-        ],
-        "recent_operations": [
-            {
-                "model": row[0],
-                "operation": row[1],
-                "chapter_name": row[2],
-                "input_tokens": row[3],
-                "output_tokens": row[4],
-                "images_generated": row[5],
-                "cost_usd": row[6],
-                "created_at": row[7]
-            }
-            for row in recent
-        ]
+        "by_model": by_model,
+        "recent_operations": recent
     }
 
 
 def register_user(name: str, email: str = None) -> int:
     """Registra o actualitza un usuari."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with transaction():
+        cursor = _connect().cursor()
+
+        if _HAS_RETURNING:
+            cursor.execute("""
+                INSERT INTO users (name, email)
+                VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                email = COALESCE(?, email)
+                RETURNING id
+            """, (name, email, email))
+            user_id = cursor.fetchone()[0]
+        else:
+            cursor.execute("""
+                INSERT INTO users (name, email)
+                VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                email = COALESCE(?, email)
+            """, (name, email, email))
+
+            cursor.execute("SELECT id FROM users WHERE name = ?", (name,))
+            user_id = cursor.fetchone()[0]
 
-    cursor.execute("""
-        INSERT INTO users (name, email)
-        VALUES (?, ?)
-        ON CONFLICT(name) DO UPDATE SET
-        email = COALESCE(?, email)
-    """, (name, email, email))
+    return user_id
 
-    cursor.execute("SELECT id FROM users WHERE name = ?", (name,))
-    user_id = cursor.fetchone()[0]
 
-    conn.commit()
-    conn.close()
-    return user_id
+def register_users_bulk(users: List[Dict]) -> List[int]:
+    """
+    Registra diversos usuaris en una sola transacció.
+
+    Args:
+        users: Diccionaris amb "name" i opcionalment "email".
+
+    Returns:
+        ID de cada usuari, en el mateix ordre.
+    """
+    with transaction():
+        return [register_user(user["name"], user.get("email")) for user in users]
 
 
 def create_session_with_user(session_id: str, user_name: str):
     """Crea una sessió associada a un usuari."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -370,7 +732,7 @@ def create_session_with_user(session_id: str, user_name: str):
 
 def update_user_stats(user_name: str, cost: float, presentations: int = 0):
     """Actualitza les estadístiques d'un usuari."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -386,7 +748,7 @@ def update_user_stats(user_name: str, cost: float, presentations: int = 0):
 
 def get_user_stats(user_name: str) -> Dict:
     """Obté les estadístiques d'un usuari."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -401,7 +763,7 @@ def get_user_stats(user_name: str) -> Dict:
 
     # Historial de sessions
     cursor.execute("""
-        SELECT id, created_at, total_cost_usd, presentations_generated
+        SELECT id, created_at, total_cost_usd as cost_usd, presentations_generated as presentations
         FROM sessions WHERE user_name = ?
         ORDER BY created_at DESC LIMIT 10
     """, (user_name,))
@@ -411,26 +773,14 @@ def get_user_stats(user_name: str) -> Dict:
 
     return {
         "exists": True,
-        "name": user[0],
-        "email": user[1],
-        "created_at": user[2],
-        "total_cost_usd": user[3],
-        "presentations_generated": user[4],
-        "recent_sessions": [
-            {
-                "id": s[0],
-                "created_at": s[1],
-                "cost_usd": s[2],
-                "presentations": s[3]
-            }
-            for s in sessions
-        ]
+        **dict(user),
+        "recent_sessions": [dict(s) for s in sessions]
     }
 
 
 def get_all_users_stats() -> List[Dict]:
     """Obté estadístiques de tots els usuaris."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -441,15 +791,7 @@ def get_all_users_stats() -> List[Dict]:
     users = cursor.fetchall()
     conn.close()
 
-    return [
-        {
-            "name": u[0],
-            "total_cost_usd": u[1],
-            "presentations_generated": u[2],
-            "created_at": u[3]
-        }
-        for u in users
-    ]
+    return [dict(u) for u in users]
 
 
 # ============================================================================
@@ -466,22 +808,29 @@ def save_presentation(
     pptx_path: str
 ):
     """Guarda una presentació generada."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with transaction():
+        _connect().execute("""
+            INSERT OR REPLACE INTO presentations
+            (task_id, user_name, chapter_name, group_name, slides_count, cost_usd, pptx_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (task_id, user_name, chapter_name, group_name, slides_count, cost_usd, pptx_path))
 
-    cursor.execute("""
-        INSERT OR REPLACE INTO presentations
-        (task_id, user_name, chapter_name, group_name, slides_count, cost_usd, pptx_path)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (task_id, user_name, chapter_name, group_name, slides_count, cost_usd, pptx_path))
 
-    conn.commit()
-    conn.close()
+def save_presentations_bulk(presentations: List[Dict]):
+    """
+    Guarda diverses presentacions en una sola transacció.
+
+    Args:
+        presentations: Diccionaris amb els mateixos camps que els arguments de save_presentation.
+    """
+    with transaction():
+        for presentation in presentations:
+            save_presentation(**presentation)
 
 
 def get_user_presentations(user_name: str) -> List[Dict]:
     """Obté totes les presentacions d'un usuari."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -493,23 +842,12 @@ def get_user_presentations(user_name: str) -> List[Dict]:
     presentations = cursor.fetchall()
     conn.close()
 
-    return [
-        {
-            "task_id": p[0],
-            "chapter_name": p[1],
-            "group_name": p[2],
-            "slides_count": p[3],
-            "cost_usd": p[4],
-            "pptx_path": p[5],
-            "created_at": p[6]
-        }
-        for p in presentations
-    ]
+    return [dict(p) for p in presentations]
 
 
 def get_all_presentations() -> List[Dict]:
     """Obté totes les presentacions."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -521,24 +859,12 @@ def get_all_presentations() -> List[Dict]:
     presentations = cursor.fetchall()
     conn.close()
 
-    return [
-        {
-            "task_id": p[0],
-            "user_name": p[1],
-            "chapter_name": p[2],
-            "group_name": p[3],
-            "slides_count": p[4],
-            "cost_usd": p[5],
-            "pptx_path": p[6],
-            "created_at": p[7]
-        }
-        for p in presentations
-    ]
+    return [dict(p) for p in presentations]
 
 
 def delete_presentation(task_id: str) -> bool:
     """Marca una presentació com a eliminada."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -554,11 +880,13 @@ def delete_presentation(task_id: str) -> bool:
 
 def get_presentation_path(task_id: str) -> Optional[str]:
     """Obté el path d'una presentació pel task_id."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect()
     cursor = conn.cursor()
 
     cursor.execute("""
-        SELECT pptx_path FROM presentations WHERE task_id = ? AND deleted = 0
+        SELECT pptx_path FROM presentations INDEXED BY idx_pres_task
+        WHERE task_id = ? AND deleted = 0
+        LIMIT 1
     """, (task_id,))
     result = cursor.fetchone()
     conn.close()
@@ -566,5 +894,143 @@ def get_presentation_path(task_id: str) -> Optional[str]:
     return result[0] if result else None
 
 
-# Inicialitzar BD al importar
-init_db()
+# ============================================================================
+# FUNCIONS PER GESTIÓ DE TASQUES
+# ============================================================================
+
+# Columnes de la taula tasks que es poden actualitzar
+TASK_FIELDS = (
+    "status", "progress", "error", "chapter_name", "group_name", "pdf_filename",
+    "user_name", "pptx_path", "docx_path", "slides_count", "cost_usd"
+)
+
+
+def create_task(task_id: str, **fields):
+    """Crea una tasca nova amb l'estat inicial."""
+    _check_task_fields(fields)
+    columns = ["id", *fields]
+    placeholders = ", ".join("?" for _ in columns)
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"INSERT INTO tasks ({', '.join(columns)}) VALUES ({placeholders})",
+        (task_id, *fields.values())
+    )
+    conn.commit()
+    conn.close()
+
+
+def update_task(task_id: str, **fields):
+    """Actualitza camps de l'estat d'una tasca."""
+    _check_task_fields(fields)
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"UPDATE tasks SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (*fields.values(), task_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_task(task_id: str) -> Optional[Dict]:
+    """Obté l'estat d'una tasca."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT id, {', '.join(TASK_FIELDS)}
+        FROM tasks WHERE id = ?
+    """, (task_id,))
+    result = cursor.fetchone()
+    conn.close()
+
+    return dict(result) if result else None
+
+
+def delete_task(task_id: str):
+    """Elimina una tasca."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+    conn.commit()
+    conn.close()
+
+
+def purge_old_tasks(max_age_hours: int = 24, max_tasks: int = 500) -> int:
+    """
+    Elimina l'estat de tasques antigues perquè la taula no creixi indefinidament.
+
+    Les presentacions completades continuen disponibles a la taula presentations.
+
+    Args:
+        max_age_hours: Antiguitat màxima (des de l'última actualització).
+        max_tasks: Nombre màxim de tasques que es conserven.
+
+    Returns:
+        Nombre de tasques eliminades.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        DELETE FROM tasks WHERE updated_at < datetime('now', ?)
+    """, (f"-{int(max_age_hours)} hours",))
+    deleted = cursor.rowcount
+    cursor.execute("""
+        DELETE FROM tasks WHERE id NOT IN (
+            SELECT id FROM tasks ORDER BY updated_at DESC LIMIT ?
+        )
+    """, (max_tasks,))
+    deleted += cursor.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def _check_task_fields(fields: Dict):
+    """Comprova que només s'actualitzen columnes conegudes de la taula tasks."""
+    unknown = set(fields) - set(TASK_FIELDS)
+    if unknown:
+        raise ValueError(f"Camps de tasca desconeguts: {', '.join(sorted(unknown))}")
+
+
+# ============================================================================
+# FUNCIONS PER CACHE DE RESPOSTES
+# ============================================================================
+
+def get_cached_response(namespace: str, cache_key: str, ttl_seconds: int) -> Optional[Dict]:
+    """
+    Obté una resposta guardada a la cache si no ha caducat.
+
+    Args:
+        namespace: Tipus de crida (ex: "structure", "describe_image").
+        cache_key: Hash de l'entrada de la crida.
+        ttl_seconds: Antiguitat màxima de l'entrada.
+
+    Returns:
+        Resposta guardada o None si no n'hi ha.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT value FROM llm_cache
+        WHERE namespace = ? AND cache_key = ?
+        AND created_at >= datetime('now', ?)
+    """, (namespace, cache_key, f"-{int(ttl_seconds)} seconds"))
+    result = cursor.fetchone()
+    conn.close()
+    return json.loads(result[0]) if result else None
+
+
+def save_cached_response(namespace: str, cache_key: str, value: Dict):
+    """Guarda (o substitueix) una resposta a la cache."""
+    conn = _connect()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR REPLACE INTO llm_cache (namespace, cache_key, value, created_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (namespace, cache_key, json.dumps(value, ensure_ascii=False)))
+    conn.commit()
+    conn.close()
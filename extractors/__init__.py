@@ -1,4 +1,24 @@
-from .pdf_extractor import extract_text
-from .image_extractor import extract_images
+"""
+Extractors de text i imatges de PDF.
+Els submòduls (i PyMuPDF) es carreguen en el primer ús.
+"""
+from importlib import import_module
 
-__all__ = ['extract_text', 'extract_images']
+# Nom exportat -> submòdul que el defineix
+_EXPORTS = {
+    'extract_text': '.pdf_extractor',
+    'extract_images': '.image_extractor',
+    'extract_all': '.document_extractor'
+}
+
+__all__ = ['extract_text', 'extract_images', 'extract_all']
+
+
+def __getattr__(name):
+    """Importa el submòdul només quan es fa servir la funció (PEP 562)."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,57 @@
+"""
+Extractor combinat de text i imatges de fitxers PDF.
+Recorre el PDF una sola vegada amb PyMuPDF (fitz) i en treu text i imatges.
+"""
+import io
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config import MIN_IMAGE_WIDTH, MIN_IMAGE_HEIGHT, IMAGES_EXTRACTED_DIR
+from extractors.image_extractor import (
+    ImageInfo, _read_pages, _save_page_images, _load_image_index, _save_image_index
+)
+
+
+def extract_all(
+    pdf_path: str | Path,
+    output_dir: Optional[Path] = None,
+    min_width: int = MIN_IMAGE_WIDTH,
+    min_height: int = MIN_IMAGE_HEIGHT
+) -> Tuple[str, List[ImageInfo]]:
+    """
+    Extreu el text i les imatges d'un PDF en una sola passada.
+
+    Args:
+        pdf_path: Ruta al fitxer PDF.
+        output_dir: Directori on guardar les imatges (per defecte: cache/images/extracted).
+        min_width: Amplada mínima de les imatges en píxels.
+        min_height: Alçada mínima de les imatges en píxels.
+
+    Returns:
+        Tupla (text complet, llista d'ImageInfo).
+    """
+    pdf_path = Path(pdf_path)
+    output_dir = output_dir or IMAGES_EXTRACTED_DIR
+
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"No s'ha trobat el fitxer: {pdf_path}")
+
+    images_dir = output_dir / pdf_path.stem
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    text_buffer = io.StringIO()  # Cada pàgina es pot alliberar un cop escrita
+    extracted_images: List[ImageInfo] = []
+    seen_images = {}  # Per evitar duplicats
+    known_images = _load_image_index(output_dir)  # Imatges d'extraccions anteriors
+
+    for page_num, text, candidates in _read_pages(pdf_path, min_width, min_height, with_text=True):
+        if text.strip():
+            if text_buffer.tell():
+                text_buffer.write("\n\n")
+            text_buffer.write(text)
+        extracted_images.extend(_save_page_images(page_num, candidates, images_dir, seen_images, known_images))
+
+    _save_image_index(output_dir, known_images)
+
+    print(f"Extretes {len(extracted_images)} imatges de {pdf_path.name}")
+    return text_buffer.getvalue(), extracted_images
@@ -2,15 +2,30 @@
 Extractor d'imatges de fitxers PDF.
 Utilitza PyMuPDF (fitz) per extreure les imatges dels capítols.
 """
-import fitz  # PyMuPDF
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from dataclasses import dataclass
-from PIL import Image
-import io
-import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+import json
+import multiprocessing
+import os
+import threading
+import zlib
 
-from config import MIN_IMAGE_WIDTH, MIN_IMAGE_HEIGHT, IMAGES_EXTRACTED_DIR
+from config import (
+    MIN_IMAGE_WIDTH, MIN_IMAGE_HEIGHT, IMAGES_EXTRACTED_DIR,
+    IMAGE_EXTRACT_WORKERS, IMAGE_EXTRACT_MIN_PAGES, IMAGE_EXTRACT_PAGES_PER_TASK
+)
+
+# Bytes inicials que entren a la clau ràpida de duplicats
+DEDUP_PREFIX_BYTES = 4096
+
+# Índex (dins el directori d'imatges extretes) de les imatges ja desades,
+# per reaprofitar-les entre PDF (logos, capçaleres d'un mateix llibre)
+IMAGE_INDEX_FILENAME = ".image_index.json"
+_index_lock = threading.Lock()
 
 
 @dataclass
@@ -54,66 +69,330 @@ def extract_images(
     images_dir = output_dir / pdf_name
     images_dir.mkdir(parents=True, exist_ok=True)
 
-    doc = fitz.open(pdf_path)
     extracted_images: List[ImageInfo] = []
-    seen_hashes = set()  # Per evitar duplicats
+    seen_images = {}  # Per evitar duplicats
+    known_images = _load_image_index(output_dir)  # Imatges d'extraccions anteriors
+
+    for page_num, _, candidates in _read_pages(pdf_path, min_width, min_height, with_text=False):
+        extracted_images.extend(_save_page_images(page_num, candidates, images_dir, seen_images, known_images))
+
+    _save_image_index(output_dir, known_images)
+
+    print(f"Extretes {len(extracted_images)} imatges de {pdf_path.name}")
+    return extracted_images
+
+
+def _read_pages(
+    pdf_path: Path,
+    min_width: int,
+    min_height: int,
+    with_text: bool
+) -> Iterator[Tuple[int, Optional[str], list]]:
+    """
+    Recorre les pàgines d'un PDF i en llegeix el text i les imatges candidates.
+
+    Els PDF llargs es reparteixen en blocs de pàgines entre processos
+    (PyMuPDF no és segur entre fils); cada procés obre el seu document.
+    Els resultats arriben en ordre de pàgina.
+
+    Args:
+        pdf_path: Ruta al fitxer PDF.
+        min_width: Amplada mínima en píxels.
+        min_height: Alçada mínima en píxels.
+        with_text: Si s'ha d'extreure també el text de cada pàgina.
+
+    Returns:
+        Iterador de tuples (índex de pàgina, text o None, imatges candidates).
+    """
+    import fitz  # PyMuPDF (import diferit: ImageInfo no el necessita)
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        workers = min(IMAGE_EXTRACT_WORKERS, -(-page_count // IMAGE_EXTRACT_PAGES_PER_TASK))
+        if workers <= 1 or page_count < IMAGE_EXTRACT_MIN_PAGES:
+            yield from _read_page_range(doc, range(page_count), min_width, min_height, with_text)
+            return
+
+    chunks = [
+        range(start, min(start + IMAGE_EXTRACT_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, IMAGE_EXTRACT_PAGES_PER_TASK)
+    ]
+    # spawn: el servidor té fils actius i fer fork amb fils no és segur
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        def submit(pages: range):
+            return pool.submit(_read_pages_worker, str(pdf_path), pages, min_width, min_height, with_text)
+
+        # Com a molt dos blocs en curs per procés: els bytes de les imatges
+        # pendents de desar no creixen amb la mida del PDF
+        chunks_left = iter(chunks)
+        pending = deque(submit(pages) for pages in islice(chunks_left, workers * 2))
+        while pending:
+            pages = pending.popleft().result()
+            next_chunk = next(chunks_left, None)
+            if next_chunk is not None:
+                pending.append(submit(next_chunk))
+            # Lliurar pàgina a pàgina i deixar anar cada una en acabar
+            pages.reverse()
+            while pages:
+                yield pages.pop()
+
+
+def _read_pages_worker(
+    pdf_path: str,
+    page_nums: range,
+    min_width: int,
+    min_height: int,
+    with_text: bool
+) -> List[Tuple[int, Optional[str], list]]:
+    """Llegeix un bloc de pàgines en un procés del pool."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        return list(_read_page_range(doc, page_nums, min_width, min_height, with_text))
+
+
+def _read_page_range(
+    doc: "fitz.Document",
+    page_nums: range,
+    min_width: int,
+    min_height: int,
+    with_text: bool
+) -> Iterator[Tuple[int, Optional[str], list]]:
+    """Llegeix text i imatges candidates d'un rang de pàgines d'un document obert."""
+    from extractors.pdf_extractor import TEXT_FLAGS
+
+    seen_xrefs = set()  # Objectes imatge ja llegits en aquest document
+    for page_num in page_nums:
+        if with_text:
+            # Una sola càrrega de la pàgina per a text i imatges
+            page = doc[page_num]
+            text = page.get_text("text", flags=TEXT_FLAGS, sort=False)
+            image_list = page.get_images(full=True)
+        else:
+            # Només imatges: la llista es llegeix sense carregar la pàgina
+            text = None
+            image_list = doc.get_page_images(page_num, full=True)
+
+        candidates = _read_page_images(doc, page_num, image_list, seen_xrefs, min_width, min_height) if image_list else []
+        yield page_num, text, candidates
+
+
+def _read_page_images(
+    doc: "fitz.Document",
+    page_num: int,
+    image_list: list,
+    seen_xrefs: set,
+    min_width: int,
+    min_height: int
+) -> list:
+    """
+    Llegeix les imatges d'una pàgina que superen la mida mínima, sense desar-les.
+
+    Args:
+        doc: Document PyMuPDF obert.
+        page_num: Índex de la pàgina (0-indexed).
+        image_list: Resultat de page.get_images(full=True).
+        seen_xrefs: Xrefs ja llegits (es modifica per no tornar-los a extreure).
+        min_width: Amplada mínima en píxels.
+        min_height: Alçada mínima en píxels.
+
+    Returns:
+        Llista de tuples (índex d'imatge, bytes, extensió, amplada, alçada).
+    """
+    candidates = []
+
+    for img_index, img_info in enumerate(image_list):
+        xref = img_info[0]
+
+        # La mateixa imatge repetida a diverses pàgines comparteix xref
+        if xref in seen_xrefs:
+            continue
+        seen_xrefs.add(xref)
+
+        # Prefiltre barat: get_images ja dona /Width i /Height del PDF
+        listed_width, listed_height = img_info[2], img_info[3]
+        if listed_width and listed_height and (listed_width < min_width or listed_height < min_height):
+            continue
+
+        try:
+            # Extreure imatge
+            base_image = doc.extract_image(xref)
+            image_bytes = base_image["image"]
+
+            # Dimensions del diccionari de PyMuPDF o de get_images (sense descodificar píxels)
+            width = base_image["width"] or listed_width
+            height = base_image["height"] or listed_height
+            if not width or not height:
+                width, height = _decode_image_size(image_bytes)
+
+            # Filtrar per mida mínima
+            if width < min_width or height < min_height:
+                continue
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        image_list = page.get_images(full=True)
+            candidates.append((img_index, image_bytes, base_image["ext"], width, height))
 
-        for img_index, img_info in enumerate(image_list):
-            xref = img_info[0]
+        except Exception as e:
+            print(f"Error extraient imatge {xref} de pàgina {page_num + 1}: {e}")
+            continue
+
+    return candidates
+
+
+def _decode_image_size(image_bytes: bytes) -> Tuple[int, int]:
+    """Llegeix la mida d'una imatge amb PIL (només si el PDF no la indica)."""
+    from PIL import Image
+    import io
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        return img.size
+
+
+def _save_page_images(
+    page_num: int,
+    candidates: list,
+    images_dir: Path,
+    seen_images: dict,
+    known_images: dict
+) -> List[ImageInfo]:
+    """
+    Desa a disc les imatges candidates d'una pàgina que no siguin duplicades.
+
+    Args:
+        page_num: Índex de la pàgina (0-indexed).
+        candidates: Resultat de _read_page_images (es buida a mesura que es desa).
+        images_dir: Directori on guardar les imatges.
+        seen_images: Clau ràpida -> rutes ja desades (es modifica per evitar duplicats).
+        known_images: Índex d'extraccions anteriors (vegeu _load_image_index).
+
+    Returns:
+        Llista d'ImageInfo amb les imatges de la pàgina.
+    """
+    page_images: List[ImageInfo] = []
+
+    for position, (img_index, image_bytes, image_ext, width, height) in enumerate(candidates):
+        candidates[position] = None  # Els bytes s'alliberen en desar la imatge
+        # Clau ràpida: mida + CRC dels primers bytes. Només si coincideix
+        # amb una imatge anterior es comparen els continguts sencers.
+        prefix_crc = zlib.crc32(memoryview(image_bytes)[:DEDUP_PREFIX_BYTES])
+        quick_key = (len(image_bytes), prefix_crc)
+        same_key_paths = seen_images.setdefault(quick_key, [])
+        if any(_has_content(path, image_bytes) for path in same_key_paths):
+            continue
+
+        # Generar ID únic
+        img_id = f"img_{page_num + 1}_{img_index + 1}_{prefix_crc:08x}"
+
+        # Reaprofitar el fitxer si una extracció anterior ja va desar la mateixa imatge
+        known_paths = known_images.setdefault(quick_key, [])
+        img_path = next((path for path in known_paths if _has_content(path, image_bytes)), None)
+
+        if img_path is None:
+            # Guardar imatge
+            img_filename = f"{img_id}.{image_ext}"
+            img_path = images_dir / img_filename
 
             try:
-                # Extreure imatge
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-
-                # Calcular hash per evitar duplicats
-                img_hash = hashlib.md5(image_bytes).hexdigest()
-                if img_hash in seen_hashes:
-                    continue
-                seen_hashes.add(img_hash)
-
-                # Obrir amb PIL per verificar dimensions
-                img = Image.open(io.BytesIO(image_bytes))
-                width, height = img.size
-
-                # Filtrar per mida mínima
-                if width < min_width or height < min_height:
-                    continue
-
-                # Generar ID únic
-                img_id = f"img_{page_num + 1}_{img_index + 1}_{img_hash[:8]}"
-
-                # Guardar imatge
-                img_filename = f"{img_id}.{image_ext}"
-                img_path = images_dir / img_filename
-
-                with open(img_path, "wb") as f:
-                    f.write(image_bytes)
-
-                # Afegir a la llista
-                extracted_images.append(ImageInfo(
-                    id=img_id,
-                    path=img_path,
-                    width=width,
-                    height=height,
-                    page_number=page_num + 1,
-                    format=image_ext,
-                    size_bytes=len(image_bytes)
-                ))
-
-            except Exception as e:
-                print(f"Error extraient imatge {xref} de pàgina {page_num + 1}: {e}")
+                _write_file(img_path, image_bytes)
+            except OSError as e:
+                print(f"Error desant imatge {img_id}: {e}")
                 continue
+            known_paths.append(img_path)
+        same_key_paths.append(img_path)
 
-    doc.close()
+        # Afegir a la llista
+        page_images.append(ImageInfo(
+            id=img_id,
+            path=img_path,
+            width=width,
+            height=height,
+            page_number=page_num + 1,
+            format=image_ext,
+            size_bytes=len(image_bytes)
+        ))
 
-    print(f"Extretes {len(extracted_images)} imatges de {pdf_path.name}")
-    return extracted_images
+    return page_images
+
+
+def _load_image_index(output_dir: Path) -> dict:
+    """
+    Carrega l'índex d'imatges desades en extraccions anteriors.
+
+    Args:
+        output_dir: Directori arrel de les imatges extretes.
+
+    Returns:
+        Diccionari (mida, CRC del prefix) -> llista de rutes.
+    """
+    try:
+        data = json.loads((output_dir / IMAGE_INDEX_FILENAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+    index = {}
+    for key, paths in data.items():
+        size, prefix_crc = key.split(":")
+        index[(int(size), int(prefix_crc))] = [output_dir / path for path in paths]
+    return index
+
+
+def _save_image_index(output_dir: Path, index: dict):
+    """
+    Desa l'índex d'imatges, fusionat amb el que hi hagi a disc.
+
+    Les rutes que ja no existeixen es descarten. L'escriptura és atòmica
+    (fitxer temporal + os.replace) perquè altres processos no llegeixin
+    un JSON a mitges.
+
+    Args:
+        output_dir: Directori arrel de les imatges extretes.
+        index: Índex actualitzat per aquesta extracció.
+    """
+    with _index_lock:
+        merged = _load_image_index(output_dir)
+        for key, paths in index.items():
+            merged_paths = merged.setdefault(key, [])
+            merged_paths.extend(path for path in paths if path not in merged_paths)
+
+        data = {}
+        for (size, prefix_crc), paths in merged.items():
+            existing = [path.relative_to(output_dir).as_posix() for path in paths if path.exists()]
+            if existing:
+                data[f"{size}:{prefix_crc}"] = existing
+
+        index_path = output_dir / IMAGE_INDEX_FILENAME
+        tmp_path = index_path.with_name(f"{IMAGE_INDEX_FILENAME}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            print(f"Error desant l'índex d'imatges: {e}")
+
+
+def _has_content(path: Path, data: bytes) -> bool:
+    """Indica si el fitxer ja desat té exactament aquests bytes."""
+    try:
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def _write_file(path: Path, data: bytes):
+    """
+    Escriu uns bytes a disc amb os.write, sense objecte fitxer amb buffer.
+
+    Args:
+        path: Ruta del fitxer (es crea o se sobreescriu).
+        data: Contingut del fitxer.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            # os.write pot escriure menys bytes dels demanats
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
 
 
 def get_image_as_base64(image_path: Path) -> str:
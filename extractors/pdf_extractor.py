@@ -3,9 +3,14 @@ Extractor de text de fitxers PDF.
 Utilitza PyMuPDF (fitz) per extreure el contingut textual dels capítols.
 """
 import fitz  # PyMuPDF
+import io
 from pathlib import Path
 from typing import Optional
 
+# Flags de text pla sense conservar lligadures: "ﬁ" surt com "fi" i MuPDF
+# no ha de mantenir els glifs compostos. sort=False evita reordenar blocs.
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
 
 def extract_text(pdf_path: str | Path, start_page: Optional[int] = None, end_page: Optional[int] = None) -> str:
     """
@@ -25,21 +30,25 @@ def extract_text(pdf_path: str | Path, start_page: Optional[int] = None, end_pag
         raise FileNotFoundError(f"No s'ha trobat el fitxer: {pdf_path}")
 
     doc = fitz.open(pdf_path)
-    text_parts = []
+    # Escriure directament al buffer: cada pàgina es pot alliberar en acabar
+    buffer = io.StringIO()
 
     # Determinar rang de pàgines
     first_page = start_page if start_page is not None else 0
-    last_page = end_page if end_page is not None else len(doc)
+    last_page = min(end_page if end_page is not None else len(doc), len(doc))
 
-    for page_num in range(first_page, min(last_page, len(doc))):
-        page = doc[page_num]
-        text = page.get_text("text")
+    # doc.pages recorre les pàgines sense indexar; amb inici >= final aniria enrere
+    pages = doc.pages(first_page, last_page) if first_page < last_page else ()
+    for page in pages:
+        text = page.get_text("text", flags=TEXT_FLAGS, sort=False)
         if text.strip():
-            text_parts.append(text)
+            if buffer.tell():
+                buffer.write("\n\n")
+            buffer.write(text)
 
     doc.close()
 
-    return "\n\n".join(text_parts)
+    return buffer.getvalue()
 
 
 def extract_text_with_metadata(pdf_path: str | Path) -> dict:
@@ -58,28 +67,33 @@ def extract_text_with_metadata(pdf_path: str | Path) -> dict:
         raise FileNotFoundError(f"No s'ha trobat el fitxer: {pdf_path}")
 
     doc = fitz.open(pdf_path)
+    page_count = len(doc)
+    pages = [None] * page_count
+    text_parts = []
+    total_words = 0
+
+    # Una sola passada: pàgines, text complet i total de paraules
+    for page_num, page in enumerate(doc.pages()):
+        text = page.get_text("text", flags=TEXT_FLAGS, sort=False)
+        word_count = len(text.split())
+
+        pages[page_num] = {
+            "number": page_num + 1,
+            "text": text,
+            "word_count": word_count
+        }
+        text_parts.append(text)
+        total_words += word_count
 
     result = {
         "filename": pdf_path.name,
-        "total_pages": len(doc),
+        "total_pages": page_count,
         "metadata": doc.metadata,
-        "pages": []
+        "pages": pages,
+        "full_text": "\n\n".join(text_parts),
+        "total_words": total_words
     }
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text("text")
-
-        result["pages"].append({
-            "number": page_num + 1,
-            "text": text,
-            "word_count": len(text.split())
-        })
-
     doc.close()
 
-    # Text complet
-    result["full_text"] = "\n\n".join(p["text"] for p in result["pages"])
-    result["total_words"] = sum(p["word_count"] for p in result["pages"])
-
     return result
@@ -1,4 +1,23 @@
-from .pptx_generator import create_presentation
-from .docx_generator import create_study_guide
+"""
+Generadors de PowerPoint i Word.
+Els submòduls (i python-pptx/python-docx) es carreguen en el primer ús.
+"""
+from importlib import import_module
+
+# Nom exportat -> submòdul que el defineix
+_EXPORTS = {
+    'create_presentation': '.pptx_generator',
+    'create_study_guide': '.docx_generator'
+}
 
 __all__ = ['create_presentation', 'create_study_guide']
+
+
+def __getattr__(name):
+    """Importa el submòdul només quan es fa servir la funció (PEP 562)."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -6,19 +6,83 @@ from pptx import Presentation
 from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.enum.shapes import MSO_SHAPE
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
+from contextlib import contextmanager
+from copy import deepcopy
 from pathlib import Path
-from typing import Optional
-import re
-
-
-# Funció helper per crear colors RGB
-def RgbColor(r, g, b):
-    """Crea un color RGB compatible amb python-pptx."""
-    return RGBColor(r, g, b)
+from typing import List, Optional
+import io
+import logging
+import os
+import zipfile
+import zlib
 
 from processors.content_processor import PresentationPlan, SlideContent
 from templates.style_config import StyleConfig
+from generators.pptx_text import content_paragraph_xml
+
+logger = logging.getLogger(__name__)
+
+# Geometria i colors fixos: es creen un sol cop, no a cada diapositiva. Les
+# mides es guarden com a EMU enters (python-pptx els accepta directament)
+_PT = {size: Pt(size).emu for size in (4, 6, 8, 12, 14, 16, 18, 20, 32, 40)}
+
+# Franja inferior (principal + accent superior)
+_STRIPE_RECT = (Inches(0).emu, Inches(7.1).emu, Inches(13.333).emu, Inches(0.4).emu)
+_STRIPE_ACCENT_RECT = (Inches(0).emu, Inches(7.05).emu, Inches(13.333).emu, Inches(0.05).emu)
+_STRIPE_COLOR = RGBColor(180, 120, 60)  # Marró/taronja
+
+# Línia separadora sota el títol (l'alçada depèn de la diapositiva)
+_SEPARATOR_LEFT = Inches(0.5).emu
+_SEPARATOR_WIDTH = Inches(12.333).emu
+_SEPARATOR_HEIGHT = Inches(0.02).emu
+_SEPARATOR_COLOR = RGBColor(139, 90, 43)  # Marró
+
+# Títol i contingut de les diapositives d'índex i de contingut
+_TITLE_RECT = (Inches(0.5).emu, Inches(0.4).emu, Inches(12).emu, Inches(1).emu)
+_CONTENT_LEFT = Inches(0.5).emu
+_CONTENT_TOP = Inches(1.6).emu
+_CONTENT_HEIGHT = Inches(5).emu
+_CONTENT_WIDTH_FULL = Inches(12).emu
+_CONTENT_WIDTH_WITH_IMAGE = Inches(6).emu
+_CONTENT_IMAGE_LEFT = Inches(6.8).emu
+_CONTENT_IMAGE_TOP = Inches(1.5).emu
+_CONTENT_IMAGE_WIDTH = Inches(6).emu  # Imatge més gran!
+_INDEX_CONTENT_WIDTH = Inches(7).emu
+_INDEX_IMAGE_LEFT = Inches(8).emu
+_INDEX_IMAGE_TOP = Inches(1.8).emu
+_INDEX_IMAGE_WIDTH = Inches(4.5).emu
+
+# Portada
+_COVER_LABEL_RECT = (Inches(0.5).emu, Inches(1.5).emu, Inches(6).emu, Inches(0.5).emu)
+_COVER_TITLE_RECT = (Inches(0.5).emu, Inches(2.0).emu, Inches(7).emu, Inches(2).emu)
+_COVER_GROUP_RECT = (Inches(0.5).emu, Inches(4.5).emu, Inches(7).emu, Inches(1.5).emu)
+_COVER_IMAGE_LEFT = Inches(8).emu
+_COVER_IMAGE_TOP = Inches(1.5).emu
+_COVER_IMAGE_WIDTH = Inches(4).emu
+
+_GRAY_LABEL = RGBColor(100, 100, 100)
+_GRAY_TEXT = RGBColor(80, 80, 80)
+
+# Directoris de sortida ja creats en aquest procés (evita un mkdir per fitxer)
+_ENSURED_DIRS: set[Path] = set()
+
+# Rectangle tal com el crea add_shape (sense vora i amb l'estil per defecte);
+# l'id i el nom s'assignen en copiar-lo a cada diapositiva
+_RECT_XML = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="0" name=""/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+    '<a:solidFill><a:srgbClr val="{color}"/></a:solidFill><a:ln><a:noFill/></a:ln></p:spPr>'
+    '<p:style><a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef></p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p></p:txBody></p:sp>'
+)
 
 
 def create_presentation(plan: PresentationPlan, output_path: str | Path) -> Path:
@@ -33,7 +97,10 @@ def create_presentation(plan: PresentationPlan, output_path: str | Path) -> Path
         Path al fitxer creat.
     """
     output_path = Path(output_path)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_dir = output_path.parent
+    if output_dir not in _ENSURED_DIRS:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(output_dir)
 
     # Crear presentació
     prs = Presentation()
@@ -42,89 +109,224 @@ def create_presentation(plan: PresentationPlan, output_path: str | Path) -> Path
     prs.slide_width = Emu(12192000)  # 13.333 inches
     prs.slide_height = Emu(6858000)  # 7.5 inches
 
+    # Totes les diapositives fan servir el layout en blanc, amb la franja
+    # inferior afegida un sol cop al layout (no a cada diapositiva)
+    blank_layout = prs.slide_layouts[6]
+    _add_bottom_stripe(blank_layout)
+
+    # Bytes de cada imatge, llegits un sol cop encara que es repeteixi
+    image_blobs = {}
+
     # Generar cada diapositiva
-    for slide_content in plan.slides:
-        if slide_content.slide_type == "title":
-            _create_title_slide(prs, slide_content, plan)
-        elif slide_content.slide_type == "index":
-            _create_index_slide(prs, slide_content)
-        else:
-            _create_content_slide(prs, slide_content)
+    with _sequential_partnames(prs.part.package):
+        for slide_content in plan.slides:
+            if slide_content.slide_type == "title":
+                _create_title_slide(prs, blank_layout, slide_content, plan, image_blobs)
+            elif slide_content.slide_type == "index":
+                _create_index_slide(prs, blank_layout, slide_content, image_blobs)
+            else:
+                _create_content_slide(prs, blank_layout, slide_content, image_blobs)
 
     # Guardar
-    prs.save(str(output_path))
-    print(f"Presentació guardada: {output_path}")
+    _save_presentation(prs, output_path)
+    logger.info(f"Presentació guardada: {output_path}")
     return output_path
 
 
-def _add_bottom_stripe(slide):
-    """Afegeix la franja inferior taronja/marró."""
-    # Franja principal
-    shape = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        Inches(0),
-        Inches(7.1),
-        Inches(13.333),
-        Inches(0.4)
-    )
-    shape.fill.solid()
-    shape.fill.fore_color.rgb = RgbColor(180, 120, 60)  # Marró/taronja
-    shape.line.fill.background()
+class _FastZipPkgWriter(_ZipPkgWriter):
+    """
+    Escriptor del .pptx amb deflate ràpid.
+
+    Les parts XML es comprimeixen amb el nivell més ràpid de zlib i les
+    imatges (PNG/JPEG, ja comprimides) es guarden sense tornar-les a comprimir.
+    """
+
+    def write(self, pack_uri: PackURI, blob: bytes) -> None:
+        if pack_uri.startswith("/ppt/media/"):
+            self._zipf.writestr(pack_uri.membername, blob, compress_type=zipfile.ZIP_STORED)
+        else:
+            self._zipf.writestr(pack_uri.membername, blob, compresslevel=zlib.Z_BEST_SPEED)
 
-    # Accent superior (línia taronja més clara)
-    line = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        Inches(0),
-        Inches(7.05),
-        Inches(13.333),
-        Inches(0.05)
-    )
-    line.fill.solid()
-    line.fill.fore_color.rgb = StyleConfig.ORANGE_PRIMARY
-    line.line.fill.background()
+
+class _FastPackageWriter(PackageWriter):
+    """PackageWriter de python-pptx que escriu amb _FastZipPkgWriter."""
+
+    def _write(self) -> None:
+        with _FastZipPkgWriter(self._pkg_file) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+
+def _save_presentation(prs: Presentation, output_path: Path):
+    """
+    Guarda la presentació com prs.save, però amb compressió ràpida.
+
+    El zip es construeix en memòria i s'escriu a disc d'un sol cop, en lloc
+    de les moltes escriptures petites que fa ZipFile sobre el fitxer.
+    """
+    package = prs.part.package
+    buffer = io.BytesIO()
+    _FastPackageWriter.write(buffer, package._rels, tuple(package.iter_parts()))
+    output_path.write_bytes(buffer.getbuffer())
+
+
+@contextmanager
+def _sequential_partnames(package):
+    """
+    Numera les parts noves del paquet sense recórrer-lo sencer a cada una.
+
+    python-pptx calcula el nom de cada part nova (p. ex. les notes de cada
+    diapositiva) recorrent totes les relacions del paquet, cosa que fa la
+    generació quadràtica en el nombre de diapositives. Mentre dura el bloc,
+    cada plantilla de nom es resol un sol cop i després només es compta.
+
+    Args:
+        package: Paquet OPC de la presentació (prs.part.package).
+    """
+    next_numbers = {}
+    find_partname = package.next_partname
+
+    def next_partname(tmpl: str) -> PackURI:
+        number = next_numbers.get(tmpl)
+        partname = find_partname(tmpl) if number is None else PackURI(tmpl % number)
+        next_numbers[tmpl] = partname.idx + 1
+        return partname
+
+    package.next_partname = next_partname
+    try:
+        yield
+    finally:
+        del package.next_partname
+
+
+def _add_bottom_stripe(layout):
+    """Afegeix la franja inferior taronja/marró al layout de les diapositives."""
+    _append_shapes(layout, _STRIPE_SHAPES)
 
 
 def _add_separator_line(slide, top: float = 1.3):
     """Afegeix línia separadora sota el títol."""
-    line = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        Inches(0.5),
-        Inches(top),
-        Inches(12.333),
-        Inches(0.02)
-    )
-    line.fill.solid()
-    line.fill.fore_color.rgb = RgbColor(139, 90, 43)  # Marró
-    line.line.fill.background()
+    shapes = _SEPARATOR_SHAPES.get(top)
+    if shapes is None:
+        rect = (_SEPARATOR_LEFT, Inches(top).emu, _SEPARATOR_WIDTH, _SEPARATOR_HEIGHT)
+        shapes = _SEPARATOR_SHAPES[top] = _parse_shapes([_rect_xml(rect, _SEPARATOR_COLOR)])
+    _append_shapes(slide, shapes)
+
+
+def _rect_xml(rect: tuple, color: RGBColor) -> str:
+    """
+    Genera l'XML d'un rectangle sòlid (<p:sp>) com el que crearia add_shape.
+
+    Args:
+        rect: (left, top, width, height) en EMU.
+        color: Color d'emplenament.
+
+    Returns:
+        XML de la forma.
+    """
+    x, y, cx, cy = rect
+    return _RECT_XML.format(x=x, y=y, cx=cx, cy=cy, color=color)
+
+
+def _parse_shapes(shapes: List[str]) -> list:
+    """Parseja l'XML de diverses formes (<p:sp>) amb un sol parse."""
+    return list(parse_xml(f"<p:spTree {nsdecls('a', 'p')}>{''.join(shapes)}</p:spTree>"))
+
+
+def _append_shapes(slide, templates: list):
+    """
+    Afegeix còpies de formes ja parsejades a la diapositiva (o layout).
+
+    Cada còpia rep l'id següent de la diapositiva i el nom que li posaria
+    add_shape ("Rectangle N").
+
+    Args:
+        slide: Diapositiva o layout de python-pptx.
+        templates: Formes plantilla (vegeu _parse_shapes).
+    """
+    sp_tree = slide.shapes._spTree
+    shape_id = slide.shapes._next_shape_id
+    for offset, template in enumerate(templates):
+        shape = deepcopy(template)
+        c_nv_pr = shape.nvSpPr.cNvPr
+        c_nv_pr.set("id", str(shape_id + offset))
+        c_nv_pr.set("name", f"Rectangle {shape_id + offset - 1}")
+        sp_tree.insert_element_before(shape, "p:extLst")
+
+
+# Formes fixes parsejades un sol cop: després només es copien
+_STRIPE_SHAPES = _parse_shapes([
+    # Franja principal
+    _rect_xml(_STRIPE_RECT, _STRIPE_COLOR),
+    # Accent superior (línia taronja més clara)
+    _rect_xml(_STRIPE_ACCENT_RECT, StyleConfig.ORANGE_PRIMARY),
+])
+_SEPARATOR_SHAPES = {}  # top (polzades) -> formes
+
 
+def _slide_image_path(content: SlideContent) -> Optional[str]:
+    """
+    Retorna la ruta de la imatge de la diapositiva si el fitxer existeix.
+
+    Una imatge que falta es descarta abans de maquetar la diapositiva: el
+    contingut ocupa tota l'amplada en lloc de deixar l'espai buit.
+    """
+    image_path = content.image.path if content.image else None
+    if not image_path:
+        return None
+    if not os.path.exists(image_path):
+        logger.warning(f"  No s'ha trobat la imatge de la diapositiva {content.number}: {image_path}")
+        return None
+    return image_path
+
+
+def _add_picture(slide, image_path: str, left, top, width, image_blobs: dict):
+    """
+    Afegeix una imatge a la diapositiva llegint el fitxer un sol cop.
+
+    python-pptx ja comparteix la part de la imatge (per SHA1) entre
+    diapositives; així tampoc es torna a llegir el fitxer a cada ús.
 
-def _create_title_slide(prs: Presentation, content: SlideContent, plan: PresentationPlan):
+    Args:
+        slide: Diapositiva de python-pptx.
+        image_path: Ruta de la imatge.
+        left, top, width: Posició i amplada (l'alçada manté la proporció).
+        image_blobs: Bytes ja llegits per ruta (un diccionari per presentació).
+    """
+    blob = image_blobs.get(image_path)
+    if blob is None:
+        blob = image_blobs[image_path] = Path(image_path).read_bytes()
+    picture = slide.shapes.add_picture(io.BytesIO(blob), left, top, width=width)
+    # Mateixa descripció que si s'afegeix per ruta (el nom del fitxer)
+    picture._element.nvPicPr.cNvPr.set("descr", os.path.basename(image_path))
+
+
+def _create_title_slide(prs: Presentation, blank_layout, content: SlideContent, plan: PresentationPlan,
+                        image_blobs: dict):
     """Crea la diapositiva de títol/portada."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
+    slide = prs.slides.add_slide(blank_layout)
+
+    # Etiqueta "Capítol X:" (KWC04 -> 04) i títol sense l'etiqueta davant
+    chapter_label_text = f"Capítol {plan.chapter_name.removeprefix('KWC')}:"
+    title_text = content.title.removeprefix(chapter_label_text).strip() or plan.chapter_title
 
     # Títol petit "Capítol X:"
-    chapter_label = slide.shapes.add_textbox(
-        Inches(0.5), Inches(1.5), Inches(6), Inches(0.5)
-    )
+    chapter_label = slide.shapes.add_textbox(*_COVER_LABEL_RECT)
     tf = chapter_label.text_frame
     p = tf.paragraphs[0]
-    p.text = f"Capítol {plan.chapter_name.replace('KWC', '')}:"
-    p.font.size = Pt(20)
-    p.font.color.rgb = RgbColor(100, 100, 100)
+    p.text = chapter_label_text
+    p.font.size = _PT[20]
+    p.font.color.rgb = _GRAY_LABEL
     p.font.name = StyleConfig.FONT_BODY
 
     # Títol principal
-    title_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(2.0), Inches(7), Inches(2)
-    )
+    title_box = slide.shapes.add_textbox(*_COVER_TITLE_RECT)
     tf = title_box.text_frame
     tf.word_wrap = True
     p = tf.paragraphs[0]
-    p.text = content.title.replace(f"Capítol {plan.chapter_name.replace('KWC', '')}:", "").strip()
-    if not p.text:
-        p.text = plan.chapter_title
-    p.font.size = Pt(40)
+    p.text = title_text
+    p.font.size = _PT[40]
     p.font.color.rgb = StyleConfig.ORANGE_PRIMARY
     p.font.name = StyleConfig.FONT_TITLE
     p.font.bold = False
@@ -133,9 +335,7 @@ def _create_title_slide(prs: Presentation, content: SlideContent, plan: Presenta
     _add_separator_line(slide, top=4.2)
 
     # Nom del grup amb membres
-    group_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(4.5), Inches(7), Inches(1.5)
-    )
+    group_box = slide.shapes.add_textbox(*_COVER_GROUP_RECT)
     tf = group_box.text_frame
     tf.word_wrap = True
     p = tf.paragraphs[0]
@@ -150,39 +350,31 @@ def _create_title_slide(prs: Presentation, content: SlideContent, plan: Presenta
         clean_group = group_text.replace("GRUP", "").strip()
         p.text = f"GRUP {clean_group}"
 
-    p.font.size = Pt(12)
-    p.font.color.rgb = RgbColor(80, 80, 80)
+    p.font.size = _PT[12]
+    p.font.color.rgb = _GRAY_TEXT
     p.font.name = StyleConfig.FONT_BODY
     p.font.bold = False
 
     # Imatge del llibre (si existeix)
-    if content.image and content.image.path:
+    image_path = _slide_image_path(content)
+    if image_path:
         try:
-            slide.shapes.add_picture(
-                content.image.path,
-                Inches(8), Inches(1.5),
-                width=Inches(4)
-            )
+            _add_picture(slide, image_path, _COVER_IMAGE_LEFT, _COVER_IMAGE_TOP, _COVER_IMAGE_WIDTH, image_blobs)
         except Exception as e:
-            print(f"  No s'ha pogut afegir imatge a portada: {e}")
-
-    _add_bottom_stripe(slide)
+            logger.warning(f"  No s'ha pogut afegir imatge a portada: {e}")
 
 
-def _create_index_slide(prs: Presentation, content: SlideContent):
+def _create_index_slide(prs: Presentation, blank_layout, content: SlideContent, image_blobs: dict):
     """Crea la diapositiva d'índex."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
+    slide = prs.slides.add_slide(blank_layout)
 
     # Títol
-    title_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(0.4), Inches(12), Inches(1)
-    )
+    title_box = slide.shapes.add_textbox(*_TITLE_RECT)
     tf = title_box.text_frame
     p = tf.paragraphs[0]
     p.text = content.title
-    p.font.size = Pt(40)
-    p.font.color.rgb = RgbColor(80, 80, 80)
+    p.font.size = _PT[40]
+    p.font.color.rgb = _GRAY_TEXT
     p.font.name = StyleConfig.FONT_TITLE
 
     _add_separator_line(slide)
@@ -201,7 +393,7 @@ def _create_index_slide(prs: Presentation, content: SlideContent):
 
     # Contingut (llista numerada)
     content_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(1.6), Inches(7), Inches(5)
+        _CONTENT_LEFT, _CONTENT_TOP, _INDEX_CONTENT_WIDTH, _CONTENT_HEIGHT
     )
     tf = content_box.text_frame
     tf.word_wrap = True
@@ -219,258 +411,66 @@ def _create_index_slide(prs: Presentation, content: SlideContent):
             if len(parts) > 1:
                 item_text = parts[1].strip()
 
-        p.text = f"{i + 1}.{item_text}"
-        p.font.size = Pt(font_size)
-        p.font.color.rgb = StyleConfig.GRAY_DARK
-        p.font.name = StyleConfig.FONT_BODY
-        p.space_after = Pt(space_after)
+        # El format va directament al run (sense passar pel setter p.text)
+        run = p.add_run()
+        run.text = f"{i + 1}.{item_text}"
+        font = run.font
+        font.size = _PT[font_size]
+        font.color.rgb = StyleConfig.GRAY_DARK
+        font.name = StyleConfig.FONT_BODY
+        p.space_after = _PT[space_after]
 
     # Imatge decorativa (si existeix)
-    if content.image and content.image.path:
+    image_path = _slide_image_path(content)
+    if image_path:
         try:
-            slide.shapes.add_picture(
-                content.image.path,
-                Inches(8), Inches(1.8),
-                width=Inches(4.5)
-            )
+            _add_picture(slide, image_path, _INDEX_IMAGE_LEFT, _INDEX_IMAGE_TOP, _INDEX_IMAGE_WIDTH, image_blobs)
         except Exception as e:
-            print(f"  No s'ha pogut afegir imatge a índex: {e}")
-
-    _add_bottom_stripe(slide)
+            logger.warning(f"  No s'ha pogut afegir imatge a índex: {e}")
 
 
-def _create_content_slide(prs: Presentation, content: SlideContent):
+def _create_content_slide(prs: Presentation, blank_layout, content: SlideContent, image_blobs: dict):
     """Crea una diapositiva de contingut amb mida de font FIXA i imatge gran."""
-    slide_layout = prs.slide_layouts[6]  # Blank
-    slide = prs.slides.add_slide(slide_layout)
-
-    # MIDA DE FONT FIXA - MAI CANVIA
-    FONT_SIZE_NORMAL = 16
-    FONT_SIZE_HEADER = 18
-    FONT_SIZE_SUBPOINT = 15
+    slide = prs.slides.add_slide(blank_layout)
 
     # Títol
-    title_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(0.4), Inches(12), Inches(1)
-    )
+    title_box = slide.shapes.add_textbox(*_TITLE_RECT)
     tf = title_box.text_frame
     p = tf.paragraphs[0]
     p.text = content.title
-    p.font.size = Pt(32)
+    p.font.size = _PT[32]
     p.font.color.rgb = StyleConfig.ORANGE_PRIMARY
     p.font.name = StyleConfig.FONT_TITLE
 
     _add_separator_line(slide)
 
     # Determinar layout segons si hi ha imatge (IMATGE GRAN!)
-    has_image = content.image and content.image.path
-    content_width = Inches(6) if has_image else Inches(12)
+    image_path = _slide_image_path(content)
+    content_width = _CONTENT_WIDTH_WITH_IMAGE if image_path else _CONTENT_WIDTH_FULL
 
     # Contingut amb format FIX
     content_box = slide.shapes.add_textbox(
-        Inches(0.5), Inches(1.6), content_width, Inches(5)
+        _CONTENT_LEFT, _CONTENT_TOP, content_width, _CONTENT_HEIGHT
     )
     tf = content_box.text_frame
     tf.word_wrap = True
 
-    for i, item in enumerate(content.content):
-        if i > 0:
-            p = tf.add_paragraph()
-        else:
-            p = tf.paragraphs[0]
-
-        # Analitzar el format de l'ítem
-        item_text, _, is_indented, is_header, color, has_bold = _parse_content_item(item)
-
-        # Determinar mida de font FIXA segons tipus
-        if is_header:
-            font_size = FONT_SIZE_HEADER
-        elif is_indented:
-            font_size = FONT_SIZE_SUBPOINT
-        else:
-            font_size = FONT_SIZE_NORMAL
-
-        # Afegir text (amb suport per negreta i subratllat)
-        if has_bold:
-            _add_text_with_bold(p, item_text, font_size, color, StyleConfig.FONT_BODY)
-        else:
-            p.text = item_text
-            p.font.size = Pt(font_size)
-            p.font.color.rgb = color
-            p.font.name = StyleConfig.FONT_BODY
-
-        # Espai FIX entre elements
-        if item_text == "" or item_text.strip() == "":
-            p.space_after = Pt(2)
-        elif is_header:
-            p.space_after = Pt(4)
-            p.font.bold = True
-        else:
-            p.space_after = Pt(5)
-
-        # Indentar si és subpunt
-        if is_indented:
-            p.level = 1
+    # Tots els paràgrafs es generen com a XML i s'insereixen d'un sol cop
+    if content.content:
+        tf._txBody.clear_content()
+        paragraphs = parse_xml(
+            f"<a:txBody {nsdecls('a')}>{''.join(map(content_paragraph_xml, content.content))}</a:txBody>"
+        )
+        tf._txBody.extend(list(paragraphs))
 
     # Imatge GRAN (si existeix)
-    if has_image:
+    if image_path:
         try:
-            img_left = Inches(6.8)
-            img_top = Inches(1.5)
-            max_width = Inches(6)  # Imatge més gran!
-
-            slide.shapes.add_picture(
-                content.image.path,
-                img_left, img_top,
-                width=max_width
-            )
+            _add_picture(slide, image_path, _CONTENT_IMAGE_LEFT, _CONTENT_IMAGE_TOP, _CONTENT_IMAGE_WIDTH, image_blobs)
         except Exception as e:
-            print(f"  No s'ha pogut afegir imatge a slide {content.number}: {e}")
-
-    _add_bottom_stripe(slide)
+            logger.warning(f"  No s'ha pogut afegir imatge a slide {content.number}: {e}")
 
     # Afegir notes de l'orador
     if content.speaker_notes:
         notes_slide = slide.notes_slide
         notes_slide.notes_text_frame.text = content.speaker_notes
-
-
-def _parse_content_item(item: str) -> tuple:
-    """
-    Analitza un ítem de contingut per determinar el seu format.
-
-    Returns:
-        tuple: (text, font_size, is_indented, is_header, color, has_formatting)
-    """
-    # Colors per defecte
-    color_dark = StyleConfig.GRAY_DARK
-    color_orange = StyleConfig.ORANGE_PRIMARY
-
-    # Valors per defecte - MIDA FIXA
-    font_size = 16  # Mida base fixa
-    is_indented = False
-    is_header = False
-    color = color_dark
-    has_formatting = ("**" in item or "__" in item) if item else False
-
-    # Detectar línia buida
-    if not item or item.strip() == "":
-        return "", 16, False, False, color_dark, False
-
-    stripped = item.strip()
-
-    # Detectar si és indentat (comença amb espais)
-    if item.startswith("  ") or item.startswith("\t"):
-        is_indented = True
-
-    # Detectar headers/subtítols en **MAJUSCULES** o MAJUSCULES sol
-    clean_stripped = stripped.replace("**", "").replace("__", "")
-    if clean_stripped.isupper() and len(clean_stripped) < 50 and clean_stripped and not clean_stripped[0].isdigit():
-        is_header = True
-        color = color_orange
-
-    # Detectar bullet points amb guió o punt
-    if stripped.startswith("-") or stripped.startswith("•"):
-        is_indented = True
-
-    # Detectar subpunts (comencen amb espai + guió)
-    if item.startswith("  -") or item.startswith("    -"):
-        is_indented = True
-
-    return item, font_size, is_indented, is_header, color, has_formatting
-
-
-def _add_text_with_bold(paragraph, text: str, base_font_size: int, base_color, font_name: str):
-    """
-    Afegeix text a un paràgraf processant **negreta** i __subratllat__.
-
-    Args:
-        paragraph: Paràgraf de python-pptx
-        text: Text amb possible sintaxi **negreta** o __subratllat__
-        base_font_size: Mida de font base
-        base_color: Color base
-        font_name: Nom de la font
-    """
-    has_bold = "**" in text
-    has_underline = "__" in text
-
-    # Si no hi ha formatació especial, afegir text normal
-    if not has_bold and not has_underline:
-        paragraph.text = text
-        paragraph.font.size = Pt(base_font_size)
-        paragraph.font.color.rgb = base_color
-        paragraph.font.name = font_name
-        return
-
-    # Netejar el text inicial del paràgraf
-    paragraph.text = ""
-
-    # Processar text amb negreta i subratllat
-    # Primer substituir __text__ per marcadors temporals
-    import uuid
-    underline_marker = f"__UL_{uuid.uuid4().hex[:4]}__"
-    underline_parts = {}
-
-    if has_underline:
-        underline_pattern = r'__([^_]+)__'
-        underline_matches = re.findall(underline_pattern, text)
-        for i, match in enumerate(underline_matches):
-            marker = f"{underline_marker}{i}"
-            text = text.replace(f"__{match}__", marker, 1)
-            underline_parts[marker] = match
-
-    # Ara processar negreta
-    pattern = r'\*\*([^*]+)\*\*'
-    parts = re.split(pattern, text)
-
-    for i, part in enumerate(parts):
-        if not part:
-            continue
-
-        # Comprovar si conté marcadors de subratllat
-        for marker, underline_text in underline_parts.items():
-            if marker in part:
-                # Dividir per el marcador
-                before, after = part.split(marker, 1)
-
-                if before:
-                    run = paragraph.add_run()
-                    run.text = before
-                    run.font.size = Pt(base_font_size)
-                    run.font.color.rgb = base_color
-                    run.font.name = font_name
-                    if i % 2 == 1:
-                        run.font.bold = True
-
-                # Text subratllat
-                run = paragraph.add_run()
-                run.text = underline_text
-                run.font.size = Pt(base_font_size)
-                run.font.color.rgb = base_color
-                run.font.name = font_name
-                run.font.underline = True
-                if i % 2 == 1:
-                    run.font.bold = True
-
-                if after:
-                    run = paragraph.add_run()
-                    run.text = after
-                    run.font.size = Pt(base_font_size)
-                    run.font.color.rgb = base_color
-                    run.font.name = font_name
-                    if i % 2 == 1:
-                        run.font.bold = True
-
-                part = ""  # Part ja processada
-                break
-
-        if part:  # Si encara queda part sense processar
-            run = paragraph.add_run()
-            run.text = part
-            run.font.size = Pt(base_font_size)
-            run.font.color.rgb = base_color
-            run.font.name = font_name
-
-            # Els índexs senars són el contingut dins **...**
-            if i % 2 == 1:
-                run.font.bold = True
@@ -0,0 +1,210 @@
+"""
+Format del text de les diapositives de contingut.
+Funcions pures (str -> str) que generen l'XML dels paràgrafs.
+
+El mòdul és Python pla amb tipus complets, sense dependre de python-pptx
+més enllà de RGBColor: es pot compilar amb mypyc (mypyc generators/pptx_text.py)
+i el .so resultant substitueix el .py sense canviar cap import.
+"""
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import re
+
+from pptx.dml.color import RGBColor
+
+from templates.style_config import StyleConfig
+
+# MIDA DE FONT FIXA del contingut - MAI CANVIA
+FONT_SIZE_NORMAL = 16
+FONT_SIZE_HEADER = 18
+FONT_SIZE_SUBPOINT = 15
+
+# Espai FIX després de cada paràgraf (punts)
+SPACE_AFTER_BLANK = 2
+SPACE_AFTER_HEADER = 4
+SPACE_AFTER_NORMAL = 5
+
+# Sintaxi **negreta** i __subratllat__ del contingut generat: el split
+# retorna trossos alterns de text pla i de text marcat (amb delimitadors)
+_RUN_RE = re.compile(r'(\*\*[^*]+\*\*|__[^_]+__)')
+_UNDERLINE_RE = re.compile(r'__([^_]+)__')
+# Com python-pptx: els caràcters de control (excepte \t i \n) s'escapen com
+# a "_xHHHH_", i \n o \v separen runs amb <a:br/> quan s'assigna p.text
+_CTRL_CHARS_RE = re.compile(r'[\x00-\x08\x0B-\x1F]')
+_LINE_BREAKS_RE = re.compile(r'\n|\v')
+
+
+def parse_content_item(item: str) -> tuple[str, int, bool, bool, RGBColor, bool]:
+    """
+    Analitza un ítem de contingut per determinar el seu format.
+
+    Returns:
+        tuple: (text, font_size, is_indented, is_header, color, has_formatting)
+    """
+    # Detectar línia buida
+    if not item or item.isspace():
+        return "", 16, False, False, StyleConfig.GRAY_DARK, False
+
+    stripped = item.strip()
+    has_formatting = "**" in item or "__" in item
+
+    # Indentat (comença amb espais o tabulador, inclosos els subpunts "  -")
+    # o bullet point amb guió o punt
+    is_indented = item.startswith(("  ", "\t")) or stripped.startswith(("-", "•"))
+
+    # Detectar headers/subtítols en **MAJUSCULES** o MAJUSCULES sol. Els
+    # marcadors no són lletres i no canvien isupper(): només es treuen (per
+    # mesurar la llargada) als ítems que ja són candidats
+    is_header = False
+    if stripped.isupper():
+        clean_stripped = stripped.replace("**", "").replace("__", "") if has_formatting else stripped
+        is_header = len(clean_stripped) < 50 and not clean_stripped[0].isdigit()
+
+    color = StyleConfig.ORANGE_PRIMARY if is_header else StyleConfig.GRAY_DARK
+
+    # Mida base fixa: la mida real la decideix qui crida segons el tipus
+    return item, 16, is_indented, is_header, color, has_formatting
+
+
+@lru_cache(maxsize=4096)
+def content_paragraph_xml(item: str) -> str:
+    """
+    Genera l'XML d'un paràgraf (<a:p>) de contingut amb mida de font FIXA.
+
+    Només depèn del text de l'ítem, així que es guarda en memòria cau: les
+    línies buides, capçaleres i bullets repetits entre diapositives no es
+    tornen a analitzar.
+
+    Args:
+        item: Ítem de contingut (pot incloure **negreta** i __subratllat__).
+
+    Returns:
+        XML del paràgraf, igual que el que deixarien els setters de python-pptx.
+    """
+    # Analitzar el format de l'ítem
+    item_text, _, is_indented, is_header, color, has_bold = parse_content_item(item)
+
+    # Determinar mida de font FIXA segons tipus
+    if is_header:
+        font_size = FONT_SIZE_HEADER
+    elif is_indented:
+        font_size = FONT_SIZE_SUBPOINT
+    else:
+        font_size = FONT_SIZE_NORMAL
+
+    # Afegir text (amb suport per negreta i subratllat)
+    if has_bold:
+        runs = text_runs_xml(item_text, font_size, color, StyleConfig.FONT_BODY)
+        default_props = '<a:defRPr b="1"/>' if is_header else ""
+    else:
+        runs = _plain_runs_xml(item_text)
+        default_props = _char_props_xml("a:defRPr", font_size, color, StyleConfig.FONT_BODY, bold=is_header)
+
+    # Espai FIX entre elements
+    if not item_text.strip():
+        space_after = SPACE_AFTER_BLANK
+    elif is_header:
+        space_after = SPACE_AFTER_HEADER
+    else:
+        space_after = SPACE_AFTER_NORMAL
+
+    # Indentar si és subpunt
+    level = ' lvl="1"' if is_indented else ""
+
+    # Les mides van en centèsimes de punt
+    return (
+        f'<a:p><a:pPr{level}><a:spcAft><a:spcPts val="{space_after * 100}"/></a:spcAft>'
+        f'{default_props}</a:pPr>{runs}</a:p>'
+    )
+
+
+def text_runs_xml(text: str, font_size: int, color: RGBColor, font_name: str) -> str:
+    """
+    Genera els runs (<a:r>) d'un text processant **negreta** i __subratllat__.
+
+    Args:
+        text: Text amb possible sintaxi **negreta** o __subratllat__
+        font_size: Mida de font base
+        color: Color base
+        font_name: Nom de la font
+
+    Returns:
+        XML dels runs, cadascun amb el seu format.
+    """
+    runs: list[str] = []
+
+    # Una sola passada: els índexs senars són els trossos amb delimitadors
+    for i, token in enumerate(_RUN_RE.split(text)):
+        if not token:
+            continue
+        if i % 2 == 0:
+            runs.append(_run_xml(token, font_size, color, font_name))
+        elif token[0] == "_":
+            runs.append(_run_xml(token[2:-2], font_size, color, font_name, underline=True))
+        else:
+            inner = token[2:-2]
+            if "__" not in inner:
+                runs.append(_run_xml(inner, font_size, color, font_name, bold=True))
+                continue
+            # __subratllat__ dins d'una negreta
+            for j, piece in enumerate(_UNDERLINE_RE.split(inner)):
+                if piece:
+                    runs.append(_run_xml(piece, font_size, color, font_name, bold=True, underline=j % 2 == 1))
+
+    return "".join(runs)
+
+
+def _run_xml(text: str, font_size: int, color: RGBColor, font_name: str,
+             bold: bool = False, underline: bool = False) -> str:
+    """Genera l'XML d'un run amb el format indicat."""
+    props = _char_props_xml("a:rPr", font_size, color, font_name, bold=bold, underline=underline)
+    return f"<a:r>{props}<a:t>{_xml_text(text)}</a:t></a:r>"
+
+
+def _plain_runs_xml(text: str) -> str:
+    """Genera els runs sense format d'un text, com fa l'assignació p.text."""
+    runs: list[str] = []
+    for i, line in enumerate(_LINE_BREAKS_RE.split(text)):
+        # Els salts només van entre trossos i no s'afegeixen runs buits
+        if i > 0:
+            runs.append("<a:br/>")
+        if line:
+            runs.append(f"<a:r><a:t>{_xml_text(line)}</a:t></a:r>")
+    return "".join(runs)
+
+
+def _char_props_xml(tag: str, font_size: int, color: RGBColor, font_name: str,
+                    bold: bool = False, underline: bool = False) -> str:
+    """
+    Genera les propietats de caràcter (<a:rPr> o <a:defRPr>).
+
+    Args:
+        tag: Nom de l'element.
+        font_size: Mida de la font (punts).
+        color: Color del text.
+        font_name: Nom de la font.
+        bold: Negreta.
+        underline: Subratllat.
+
+    Returns:
+        XML de les propietats.
+    """
+    attrs = f'sz="{font_size * 100}"'
+    if underline:
+        attrs += ' u="sng"'
+    if bold:
+        attrs += ' b="1"'
+    return (
+        f'<{tag} {attrs}><a:solidFill><a:srgbClr val="{color}"/></a:solidFill>'
+        f'<a:latin typeface="{escape(font_name, {chr(34): "&quot;"})}"/></{tag}>'
+    )
+
+
+def _escape_ctrl_char(match: re.Match) -> str:
+    """Escapa un caràcter de control com "_xHHHH_"."""
+    return "_x%04X_" % ord(match.group())
+
+
+def _xml_text(text: str) -> str:
+    """Escapa un text per a <a:t> igual que python-pptx."""
+    return escape(_CTRL_CHARS_RE.sub(_escape_ctrl_char, text))
@@ -13,6 +13,7 @@ Exemple:
 """
 import sys
 import argparse
+import logging
 from pathlib import Path
 from datetime import datetime
 
@@ -20,9 +21,12 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent))
 
 from config import validate_config, OUTPUT_DIR
-from extractors import extract_text, extract_images
-from processors import describe_images, structure_presentation, generate_missing_images
-from generators import create_presentation, create_study_guide
+
+logger = logging.getLogger("menag")
+
+# Els mòduls de cada etapa (PyMuPDF, SDKs d'IA, python-pptx...) s'importen
+# just abans de fer-los servir: --help i els errors de configuració no els
+# carreguen
 
 
 def main():
@@ -46,91 +50,102 @@ Exemples:
 
     args = parser.parse_args()
 
+    # Missatges de progrés (també els dels mòduls de cada etapa) per stdout
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
     # Validar configuració
-    print("=" * 60)
-    print("MENAG PRESENTATION GENERATOR")
-    print("=" * 60)
-    print()
+    logger.info("=" * 60)
+    logger.info("MENAG PRESENTATION GENERATOR")
+    logger.info("=" * 60)
+    logger.info("")
 
     try:
         validate_config()
-        print("✓ Configuració validada")
+        logger.info("✓ Configuració validada")
     except ValueError as e:
-        print(f"✗ Error de configuració:\n{e}")
-        print("\nAssegura't de crear el fitxer .env amb les API keys.")
-        print("Pots copiar .env.example com a plantilla.")
+        logger.error(f"✗ Error de configuració:\n{e}")
+        logger.error("\nAssegura't de crear el fitxer .env amb les API keys.")
+        logger.error("Pots copiar .env.example com a plantilla.")
         sys.exit(1)
 
     pdf_path = Path(args.pdf_path)
     if not pdf_path.exists():
-        print(f"✗ No s'ha trobat el fitxer: {pdf_path}")
+        logger.error(f"✗ No s'ha trobat el fitxer: {pdf_path}")
         sys.exit(1)
 
-    print(f"✓ PDF trobat: {pdf_path.name}")
-    print()
+    logger.info(f"✓ PDF trobat: {pdf_path.name}")
+    logger.info("")
 
-    # 1. Extreure text
-    print("1. Extraient text del PDF...")
-    chapter_text = extract_text(pdf_path)
-    word_count = len(chapter_text.split())
-    print(f"   Extret: {word_count} paraules")
-    print()
+    # 1-2. Extreure text i imatges (una sola lectura del PDF)
+    from extractors import extract_text, extract_all
 
-    # 2. Extreure imatges
     image_catalog = []
     if not args.skip_image_extraction:
-        print("2. Extraient imatges del PDF...")
-        images = extract_images(pdf_path)
-        print(f"   Extretes: {len(images)} imatges")
+        logger.info("1. Extraient text i imatges del PDF...")
+        chapter_text, images = extract_all(pdf_path)
+    else:
+        logger.info("1. Extraient text del PDF...")
+        chapter_text = extract_text(pdf_path)
+        images = []
+    word_count = len(chapter_text.split())
+    logger.info(f"   Extret: {word_count} paraules")
+    logger.info("")
+
+    if not args.skip_image_extraction:
+        logger.info(f"2. Extretes: {len(images)} imatges")
 
         if images:
-            print()
-            print("3. Descrivint imatges amb Gemini Flash...")
+            logger.info("")
+            logger.info("3. Descrivint imatges amb Gemini Flash...")
+            from processors import describe_images
             image_catalog = describe_images(images)
-            print(f"   Descrites: {len(image_catalog)} imatges")
+            logger.info(f"   Descrites: {len(image_catalog)} imatges")
     else:
-        print("2. Salt d'extracció d'imatges (--skip-image-extraction)")
-        print("3. Salt descripció d'imatges")
+        logger.info("2. Salt d'extracció d'imatges (--skip-image-extraction)")
+        logger.info("3. Salt descripció d'imatges")
 
-    print()
+    logger.info("")
 
     # 4. Estructurar amb Opus 4.5
-    print("4. Estructurant presentació amb Claude Opus 4.5...")
+    logger.info("4. Estructurant presentació amb Claude Opus 4.5...")
+    from processors import structure_presentation
     plan = structure_presentation(
         chapter_text,
         image_catalog,
         args.chapter_name,
         args.group_name
     )
-    print(f"   Generades: {len(plan.slides)} diapositives")
-    print()
+    logger.info(f"   Generades: {len(plan.slides)} diapositives")
+    logger.info("")
 
     # 5. Generar imatges (si cal)
     if not args.no_images:
-        print("5. Generant imatges amb Nano Banana...")
+        logger.info("5. Generant imatges amb Nano Banana...")
+        from processors import generate_missing_images
         plan = generate_missing_images(plan, image_catalog)
     else:
-        print("5. Salt generació d'imatges (--no-images)")
+        logger.info("5. Salt generació d'imatges (--no-images)")
 
-    print()
+    logger.info("")
 
     # 6. Crear PPT i DOCX
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
     output_base = OUTPUT_DIR / f"{args.chapter_name}_{args.group_name}_{timestamp}"
 
-    print("6. Generant fitxers finals...")
+    logger.info("6. Generant fitxers finals...")
+    from generators import create_presentation
     pptx_path = create_presentation(plan, f"{output_base}.pptx")
     # docx_path = create_study_guide(plan, f"{output_base}_xuleta.docx")  # DESACTIVAT
 
-    print()
-    print("=" * 60)
-    print("COMPLETAT!")
-    print("=" * 60)
-    print()
-    print(f"Fitxers generats:")
-    print(f"  PowerPoint: {pptx_path}")
-    print()
-    print("Bona sort amb la presentació!")
+    logger.info("")
+    logger.info("=" * 60)
+    logger.info("COMPLETAT!")
+    logger.info("=" * 60)
+    logger.info("")
+    logger.info(f"Fitxers generats:")
+    logger.info(f"  PowerPoint: {pptx_path}")
+    logger.info("")
+    logger.info("Bona sort amb la presentació!")
 
 
 if __name__ == "__main__":
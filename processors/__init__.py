@@ -1,5 +1,25 @@
-from .gemini_processor import describe_images
-from .content_processor import structure_presentation
-from .image_generator import generate_missing_images
+"""
+Processadors amb IA: descripció d'imatges, estructura i generació d'imatges.
+Els submòduls (i els SDK d'Anthropic i Google) es carreguen en el primer ús.
+"""
+from importlib import import_module
 
-__all__ = ['describe_images', 'structure_presentation', 'generate_missing_images']
+# Nom exportat -> submòdul que el defineix
+_EXPORTS = {
+    'describe_images': '.gemini_processor',
+    'structure_presentation': '.content_processor',
+    'structure_presentations_batch': '.content_processor',
+    'generate_missing_images': '.image_generator'
+}
+
+__all__ = ['describe_images', 'structure_presentation', 'structure_presentations_batch', 'generate_missing_images']
+
+
+def __getattr__(name):
+    """Importa el submòdul només quan es fa servir la funció (PEP 562)."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
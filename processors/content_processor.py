@@ -3,22 +3,37 @@ Processador de contingut amb Claude Opus 4.5.
 Estructura el contingut del capítol i crea el pla de la presentació.
 """
 import anthropic
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
-import json
+import hashlib
+import threading
 import time
 
-from config import ANTHROPIC_API_KEY, CLAUDE_MODEL, TARGET_SLIDES, TARGET_DURATION_MINUTES, MAX_TOKENS, API_TIMEOUT
-from database import log_usage, get_api_keys
+from config import ANTHROPIC_API_KEY, CLAUDE_MODEL, TARGET_SLIDES, TARGET_DURATION_MINUTES, MAX_TOKENS, API_TIMEOUT, LLM_CACHE_TTL, BATCH_POLL_INTERVAL, BATCH_MAX_WAIT
+from database import log_usage, get_api_keys, get_cached_response, save_cached_response
+from processors.ratelimit import anthropic_limiter, estimate_tokens, retry_wait
+from processors.json_response import parse_json_response
 
 # Configuració de retry
 MAX_RETRIES = 8
 INITIAL_RETRY_DELAY = 15  # segons
 MAX_RETRY_DELAY = 120  # màxim segons d'espera entre intents
+
+# Cache de prompts d'Anthropic (mínim de tokens perquè un bloc es pugui cachejar)
+CACHE_CONTROL = {"type": "ephemeral"}
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Marca que apareix un cop per diapositiva a la resposta (per comptar-les mentre arriben)
+SLIDE_MARKER = '"slide_type"'
+
+# Un client per API key, compartit entre capítols i fils: el pool de
+# connexions HTTP (i les connexions TLS obertes) es reutilitza entre crides
+_clients: Dict[str, anthropic.Anthropic] = {}
+_clients_lock = threading.Lock()
 from processors.gemini_processor import ImageCatalogEntry, catalog_to_text
 
 
-@dataclass
+@dataclass(slots=True)
 class SlideImage:
     """Configuració d'imatge per a una diapositiva."""
     source: str  # "catalog" o "generate"
@@ -27,7 +42,7 @@ class SlideImage:
     path: Optional[str] = None  # Path a la imatge (s'omple després)
 
 
-@dataclass
+@dataclass(slots=True)
 class SlideContent:
     """Contingut d'una diapositiva."""
     number: int
@@ -39,7 +54,7 @@ class SlideContent:
     duration_seconds: int = 60  # Temps estimat
 
 
-@dataclass
+@dataclass(slots=True)
 class PresentationPlan:
     """Pla complet de la presentació."""
     chapter_name: str
@@ -50,35 +65,9 @@ class PresentationPlan:
     study_summary: str = ""
 
 
-def structure_presentation(
-    chapter_text: str,
-    image_catalog: List[ImageCatalogEntry],
-    chapter_name: str,
-    group_name: str = "GRUP",
-    session_id: str = "default",
-    api_key: str = None
-) -> PresentationPlan:
-    """
-    Estructura el contingut del capítol en una presentació.
-
-    Args:
-        chapter_text: Text complet del capítol.
-        image_catalog: Catàleg d'imatges disponibles.
-        chapter_name: Nom del capítol (ex: "KWC04").
-        group_name: Nom del grup (ex: "GRUPG").
-
-    Returns:
-        Pla de presentació amb totes les diapositives.
-    """
-    # Usar API key proporcionada o la configurada
-    effective_api_key = api_key or get_api_keys().get("anthropic") or ANTHROPIC_API_KEY
-    client = anthropic.Anthropic(api_key=effective_api_key)
-
-    # Preparar catàleg d'imatges com a text
-    catalog_text = catalog_to_text(image_catalog)
-
-    # Prompt per Opus 4.5
-    system_prompt = """Ets un expert en crear presentacions acadèmiques d'alta qualitat.
+# Prompt del sistema per Opus 4.5. És invariant: es construeix un sol cop i,
+# amb cache_control, és el prefix que comparteixen totes les crides
+SYSTEM_PROMPT = """Ets un expert en crear presentacions acadèmiques d'alta qualitat.
 La teva tasca és estructurar el contingut d'un capítol d'un llibre d'administració d'empreses
 en una presentació EQUILIBRADA per a una exposició de **MÀXIM 20 MINUTS**.
 
@@ -362,16 +351,236 @@ REGLES GENERALS:
 • USA IMATGES DEL CATÀLEG si encaixen perfectament
 • Respon NOMÉS amb JSON vàlid, sense text addicional"""
 
-    user_prompt = f"""CAPÍTOL: {chapter_name}
-GRUP: {group_name}
+# Eina que el model està obligat a cridar: la resposta arriba com a JSON ja
+# validat amb aquest esquema, sense marques de codi ni text al voltant
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+PLAN_TOOL = {
+    "name": "emit_plan",
+    "description": "Retorna el pla complet de la presentació.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "chapter_title": _STRING,
+            "slides": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "number": {"type": "integer"},
+                        "slide_type": {"type": "string", "enum": ["title", "index", "content", "diagram", "conclusion"]},
+                        "title": _STRING,
+                        "content": _STRING_LIST,
+                        "speaker_notes": _STRING,
+                        "image": {
+                            "anyOf": [
+                                {
+                                    "type": "object",
+                                    "properties": {
+                                        "source": {"type": "string", "enum": ["catalog", "generate"]},
+                                        "catalog_id": _STRING,
+                                        "generate_prompt": _STRING
+                                    },
+                                    "required": ["source"]
+                                },
+                                {"type": "null"}
+                            ]
+                        },
+                        "duration_seconds": {"type": "integer"}
+                    },
+                    "required": ["number", "slide_type", "title", "content", "speaker_notes"]
+                }
+            },
+            "key_concepts": _STRING_LIST,
+            "study_summary": _STRING
+        },
+        "required": ["chapter_title", "slides", "key_concepts", "study_summary"]
+    }
+}
 
-{catalog_text}
 
-CONTINGUT DEL CAPÍTOL:
+def structure_presentation(
+    chapter_text: str,
+    image_catalog: List[ImageCatalogEntry],
+    chapter_name: str,
+    group_name: str = "GRUP",
+    session_id: str = "default",
+    api_key: str = None,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> PresentationPlan:
+    """
+    Estructura el contingut del capítol en una presentació.
+
+    Args:
+        chapter_text: Text complet del capítol.
+        image_catalog: Catàleg d'imatges disponibles.
+        chapter_name: Nom del capítol (ex: "KWC04").
+        group_name: Nom del grup (ex: "GRUPG").
+        on_progress: Funció opcional que rep el nombre de diapositives rebudes
+            mentre la resposta arriba.
+
+    Returns:
+        Pla de presentació amb totes les diapositives.
+    """
+    client = _get_client(api_key)
+    system_prompt, chapter_prompt, request_prompt = _build_prompts(
+        chapter_text, image_catalog, chapter_name, group_name
+    )
+
+    # Reutilitzar el pla si ja s'ha generat per exactament la mateixa entrada
+    cache_key = _structure_cache_key(system_prompt, chapter_prompt, request_prompt)
+    data = get_cached_response("structure", cache_key, LLM_CACHE_TTL)
+    if data is not None:
+        print("Pla de presentació recuperat de la cache")
+    else:
+        data = _request_structure(
+            client, system_prompt, chapter_prompt, request_prompt, session_id, chapter_name, on_progress
+        )
+        save_cached_response("structure", cache_key, data)
+
+    return _build_plan(data, chapter_name, group_name)
+
+
+def structure_presentations_batch(
+    chapters: List[Tuple[str, List[ImageCatalogEntry], str]],
+    group_name: str = "GRUP",
+    session_id: str = "default",
+    api_key: str = None,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    max_wait: float = BATCH_MAX_WAIT
+) -> List[PresentationPlan]:
+    """
+    Estructura diversos capítols alhora amb l'API de lots (Message Batches).
+
+    Els lots costen la meitat i el proveïdor els processa en paral·lel, a canvi
+    de no ser interactius. Els capítols que ja són a la cache no s'envien, i si
+    només en queda un es fa la crida normal.
+
+    Args:
+        chapters: Tuples (text del capítol, catàleg d'imatges, nom del capítol).
+        group_name: Nom del grup (ex: "GRUPG").
+        poll_interval: Segons entre consultes de l'estat del lot.
+        max_wait: Segons màxims d'espera del lot abans de cancel·lar-lo.
+
+    Returns:
+        Plans de presentació, en el mateix ordre que els capítols.
+    """
+    client = _get_client(api_key)
+
+    results = {}
+    pending = {}
+    for index, (chapter_text, image_catalog, chapter_name) in enumerate(chapters):
+        prompts = _build_prompts(chapter_text, image_catalog, chapter_name, group_name)
+        cache_key = _structure_cache_key(*prompts)
+        data = get_cached_response("structure", cache_key, LLM_CACHE_TTL)
+        if data is not None:
+            print(f"Pla de {chapter_name} recuperat de la cache")
+            results[index] = data
+        else:
+            pending[index] = (prompts, cache_key, chapter_name)
+
+    if len(pending) == 1:
+        index, (prompts, cache_key, chapter_name) = pending.popitem()
+        results[index] = _request_structure(client, *prompts, session_id, chapter_name)
+        save_cached_response("structure", cache_key, results[index])
+    elif pending:
+        for index, data in _request_structure_batch(client, pending, session_id, poll_interval, max_wait).items():
+            results[index] = data
+            save_cached_response("structure", pending[index][1], data)
+
+    return [
+        _build_plan(results[index], chapter_name, group_name)
+        for index, (_, _, chapter_name) in enumerate(chapters)
+    ]
+
+
+def _get_client(api_key: Optional[str]) -> anthropic.Anthropic:
+    """Retorna el client d'Anthropic de la API key proporcionada o la configurada."""
+    effective_api_key = api_key or get_api_keys().get("anthropic") or ANTHROPIC_API_KEY
+    with _clients_lock:
+        client = _clients.get(effective_api_key)
+        if client is None:
+            client = _clients[effective_api_key] = anthropic.Anthropic(api_key=effective_api_key)
+    return client
+
+
+def _structure_cache_key(system_prompt: str, chapter_prompt: str, request_prompt: str) -> str:
+    """Clau de la cache de respostes per a una entrada concreta."""
+    return hashlib.sha256(
+        "\x00".join([CLAUDE_MODEL, system_prompt, chapter_prompt, request_prompt]).encode("utf-8")
+    ).hexdigest()
+
+
+def _build_prompts(
+    chapter_text: str,
+    image_catalog: List[ImageCatalogEntry],
+    chapter_name: str,
+    group_name: str
+) -> Tuple[str, str, str]:
+    """
+    Construeix els prompts per estructurar un capítol.
+
+    Returns:
+        tuple: (prompt del sistema, prompt del capítol, prompt de la petició)
+    """
+    # Preparar catàleg d'imatges com a text
+    catalog_text = catalog_to_text(image_catalog)
+
+    # El text del capítol i el catàleg (tots dos depenen només del PDF) van abans
+    # de les dades variables (nom, grup) perquè formin part del prefix cachejat
+    # quan es regenera per a un altre grup
+    chapter_prompt = f"""CONTINGUT DEL CAPÍTOL:
 {chapter_text}
 
+{catalog_text}"""
+
+    request_prompt = f"""CAPÍTOL: {chapter_name}
+GRUP: {group_name}
+
 Genera el pla de presentació en format JSON."""
 
+    return SYSTEM_PROMPT, chapter_prompt, request_prompt
+
+
+def _message_params(system_prompt: str, chapter_prompt: str, request_prompt: str) -> dict:
+    """Paràmetres de la crida a Opus 4.5, compartits per la crida directa i els lots."""
+    # Punts de cache de prompts: instruccions del sistema i text del capítol amb el catàleg.
+    # Els reintents i les regeneracions en pocs minuts només paguen ~10% d'aquests tokens.
+    system_blocks = [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+    chapter_block = {"type": "text", "text": chapter_prompt}
+    if len(chapter_prompt) // 4 >= PROMPT_CACHE_MIN_TOKENS:
+        chapter_block["cache_control"] = CACHE_CONTROL
+    user_content = [chapter_block, {"type": "text", "text": request_prompt}]
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": MAX_TOKENS,
+        "messages": [
+            {"role": "user", "content": user_content}
+        ],
+        "system": system_blocks,
+        "tools": [PLAN_TOOL],
+        "tool_choice": {"type": "tool", "name": PLAN_TOOL["name"]}
+    }
+
+
+def _request_structure(
+    client: anthropic.Anthropic,
+    system_prompt: str,
+    chapter_prompt: str,
+    request_prompt: str,
+    session_id: str,
+    chapter_name: str,
+    on_progress: Optional[Callable[[int], None]] = None
+) -> dict:
+    """
+    Crida Opus 4.5 (amb reintents) i retorna la resposta JSON parsejada.
+
+    La resposta arriba en streaming: no hi ha límit de temps per connexió
+    llarga i es pot informar de les diapositives a mesura que arriben.
+    """
+    params = _message_params(system_prompt, chapter_prompt, request_prompt)
+    prompt_tokens = estimate_tokens(system_prompt + chapter_prompt + request_prompt)
+
     # Cridar Opus 4.5 amb retry automàtic
     print("Estructurant presentació amb Opus 4.5...")
     response = None
@@ -379,33 +588,31 @@ Genera el pla de presentació en format JSON."""
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=MAX_TOKENS,
-                timeout=API_TIMEOUT,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ],
-                system=system_prompt
-            )
+            with anthropic_limiter.reserve(estimated_tokens=prompt_tokens):
+                # Sense reintents del SDK: els gestiona aquest bucle
+                stream_manager = client.with_options(max_retries=0).messages.stream(timeout=API_TIMEOUT, **params)
+                with stream_manager as stream:
+                    _report_slides(stream, on_progress)
+                    response = stream.get_final_message()
             break  # Si funciona, sortim del bucle
 
         except anthropic.APIStatusError as e:
             last_error = e
+            # L'espera és la que indica l'API (Retry-After) o backoff exponencial
             if e.status_code in (529, 503, 502):  # Overloaded o servidor no disponible
-                wait_time = min(INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-                print(f"  API saturada ({e.status_code}). Reintentant en {wait_time}s... (intent {attempt + 1}/{MAX_RETRIES})")
+                wait_time = retry_wait(e, INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
+                print(f"  API saturada ({e.status_code}). Reintentant en {wait_time:.0f}s... (intent {attempt + 1}/{MAX_RETRIES})")
                 time.sleep(wait_time)
             elif e.status_code == 429:  # Rate limit
-                wait_time = min(INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-                print(f"  Límit de velocitat (429). Reintentant en {wait_time}s... (intent {attempt + 1}/{MAX_RETRIES})")
+                wait_time = retry_wait(e, INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
+                print(f"  Límit de velocitat (429). Reintentant en {wait_time:.0f}s... (intent {attempt + 1}/{MAX_RETRIES})")
                 time.sleep(wait_time)
             else:
                 raise  # Altres errors els propaguem
         except anthropic.APIConnectionError as e:
             last_error = e
-            wait_time = min(INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-            print(f"  Error de connexió. Reintentant en {wait_time}s... (intent {attempt + 1}/{MAX_RETRIES})")
+            wait_time = retry_wait(e, INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
+            print(f"  Error de connexió. Reintentant en {wait_time:.0f}s... (intent {attempt + 1}/{MAX_RETRIES})")
             time.sleep(wait_time)
 
     if response is None:
@@ -415,33 +622,169 @@ Genera el pla de presentació en format JSON."""
             f"Suggeriment: L'API d'Anthropic pot estar saturada. Espera uns minuts i torna-ho a provar."
         )
 
-    # Registrar ús de tokens
+    _log_structure_usage(response, session_id, chapter_name)
+    return _parse_structure_response(response)
+
+
+def _report_slides(stream, on_progress: Optional[Callable[[int], None]]):
+    """
+    Consumeix la resposta en streaming i informa de cada diapositiva nova.
+
+    Args:
+        stream: Esdeveniments de la resposta (el JSON arriba en trossos de l'eina).
+        on_progress: Funció que rep el nombre de diapositives rebudes.
+    """
+    slides = 0
+    tail = ""  # Final del tros anterior (la marca pot quedar partida entre trossos)
+    for event in stream:
+        if event.type == "input_json":
+            text = event.partial_json
+        elif event.type == "text":
+            text = event.text
+        else:
+            continue
+        chunk = tail + text
+        found = chunk.count(SLIDE_MARKER)
+        tail = chunk[-(len(SLIDE_MARKER) - 1):]
+        if found:
+            slides += found
+            print(f"  Diapositiva {slides} rebuda")
+            if on_progress:
+                on_progress(slides)
+
+
+def _request_structure_batch(
+    client: anthropic.Anthropic,
+    pending: dict,
+    session_id: str,
+    poll_interval: float,
+    max_wait: float
+) -> dict:
+    """
+    Envia diversos capítols en un sol lot i espera que acabi.
+
+    Si el lot no acaba a temps o no se'n poden llegir els resultats, els
+    capítols que faltin es demanen amb crides directes.
+
+    Args:
+        client: Client d'Anthropic.
+        pending: Índex del capítol -> ((prompts), clau de cache, nom del capítol).
+        session_id: Sessió on es registra l'ús.
+        poll_interval: Segons entre consultes de l'estat del lot.
+        max_wait: Segons màxims d'espera del lot abans de cancel·lar-lo.
+
+    Returns:
+        Índex del capítol -> resposta JSON parsejada.
+    """
+    requests = [
+        {"custom_id": f"chapter-{index}", "params": _message_params(*prompts)}
+        for index, (prompts, _, _) in pending.items()
+    ]
+
+    print(f"Estructurant {len(requests)} capítols amb un lot d'Opus 4.5...")
+    batch = anthropic_limiter.call(client.messages.batches.create, requests=requests)
+    print(f"  Lot enviat: {batch.id}")
+
+    results = {}
+    if _wait_for_batch(client, batch, poll_interval, max_wait):
+        try:
+            for entry in client.messages.batches.results(batch.id):
+                index = int(entry.custom_id.removeprefix("chapter-"))
+                if entry.result.type != "succeeded":
+                    continue
+                chapter_name = pending[index][2]
+                _log_structure_usage(entry.result.message, session_id, chapter_name, batch=True)
+                results[index] = _parse_structure_response(entry.result.message)
+        except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+            print(f"  No s'han pogut llegir els resultats del lot {batch.id}: {e}")
+
+    # Els capítols que el lot no ha pogut processar es tornen a demanar un per un
+    for index, (prompts, _, chapter_name) in pending.items():
+        if index not in results:
+            print(f"  El lot no ha processat {chapter_name}. Reintentant amb una crida directa...")
+            results[index] = _request_structure(client, *prompts, session_id, chapter_name)
+
+    return results
+
+
+def _wait_for_batch(client: anthropic.Anthropic, batch, poll_interval: float, max_wait: float) -> bool:
+    """
+    Espera que un lot acabi, reintentant els errors transitoris de la consulta.
+
+    Args:
+        client: Client d'Anthropic.
+        batch: Lot enviat.
+        poll_interval: Segons entre consultes de l'estat del lot.
+        max_wait: Segons màxims d'espera.
+
+    Returns:
+        True si el lot ha acabat; False si s'ha esgotat el temps (el lot es cancel·la).
+    """
+    deadline = time.monotonic() + max_wait
+    failures = 0
+    wait_time = poll_interval
+    while batch.processing_status != "ended":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"  El lot {batch.id} no ha acabat en {max_wait:.0f}s. Cancel·lant...")
+            try:
+                anthropic_limiter.call(client.messages.batches.cancel, batch.id)
+            except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+                print(f"  No s'ha pogut cancel·lar el lot {batch.id}: {e}")
+            return False
+
+        time.sleep(min(wait_time, remaining))
+        try:
+            with anthropic_limiter.reserve():
+                batch = client.messages.batches.retrieve(batch.id)
+            failures = 0
+            wait_time = poll_interval
+        except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+            # Només es reintenten els errors transitoris (xarxa, 429, 5xx)
+            if isinstance(e, anthropic.APIStatusError) and e.status_code != 429 and e.status_code < 500:
+                raise
+            wait_time = retry_wait(e, poll_interval * (2 ** failures), MAX_RETRY_DELAY)
+            failures += 1
+            print(f"  Error consultant el lot {batch.id}. Reintentant en {wait_time:.0f}s...")
+    return True
+
+
+def _log_structure_usage(response, session_id: str, chapter_name: str, batch: bool = False):
+    """Registra l'ús de tokens d'una resposta d'Opus 4.5."""
     input_tokens = response.usage.input_tokens
     output_tokens = response.usage.output_tokens
+    cache_write_tokens = getattr(response.usage, "cache_creation_input_tokens", 0) or 0
+    cache_read_tokens = getattr(response.usage, "cache_read_input_tokens", 0) or 0
     cost = log_usage(
         session_id=session_id,
         model=CLAUDE_MODEL,
         input_tokens=input_tokens,
         output_tokens=output_tokens,
         operation="structure_presentation",
-        chapter_name=chapter_name
+        chapter_name=chapter_name,
+        cache_write_tokens=cache_write_tokens,
+        cache_read_tokens=cache_read_tokens,
+        batch=batch
     )
-    print(f"  Tokens: {input_tokens:,} input, {output_tokens:,} output | Cost: ${cost:.4f}")
+    print(f"  Tokens: {input_tokens:,} input, {output_tokens:,} output, "
+          f"{cache_read_tokens:,} de cache, {cache_write_tokens:,} a cache | Cost: ${cost:.4f}")
+
+
+def _parse_structure_response(response) -> dict:
+    """Extreu el pla de la crida a l'eina o, si no n'hi ha, del text de la resposta."""
+    for block in response.content:
+        if block.type == "tool_use":
+            return block.input
+    return parse_json_response(response.content[0].text)
 
-    # Parsejar resposta
-    response_text = response.content[0].text.strip()
 
-    # Netejar possibles marques de codi
-    if response_text.startswith("```"):
-        response_text = response_text.split("```")[1]
-        if response_text.startswith("json"):
-            response_text = response_text[4:]
-    if response_text.endswith("```"):
-        response_text = response_text[:-3]
-    response_text = response_text.strip()
+# Valors per defecte dels camps que el model pot ometre
+_SLIDE_DEFAULTS = {"number": 0, "slide_type": "content", "title": "", "speaker_notes": "", "duration_seconds": 60}
+_IMAGE_DEFAULTS = {"source": "generate", "catalog_id": None, "generate_prompt": None}
 
-    data = json.loads(response_text)
 
+def _build_plan(data: dict, chapter_name: str, group_name: str) -> PresentationPlan:
+    """Construeix el PresentationPlan a partir de la resposta JSON del model."""
     # Construir PresentationPlan
     plan = PresentationPlan(
         chapter_name=chapter_name,
@@ -451,26 +794,14 @@ Genera el pla de presentació en format JSON."""
         study_summary=data.get("study_summary", "")
     )
 
-    # Processar slides
+    # Processar slides: els valors per defecte es completen amb els de la resposta
     for slide_data in data.get("slides", []):
-        image = None
-        if slide_data.get("image"):
-            img_data = slide_data["image"]
-            image = SlideImage(
-                source=img_data.get("source", "generate"),
-                catalog_id=img_data.get("catalog_id"),
-                generate_prompt=img_data.get("generate_prompt")
-            )
-
-        plan.slides.append(SlideContent(
-            number=slide_data.get("number", 0),
-            slide_type=slide_data.get("slide_type", "content"),
-            title=slide_data.get("title", ""),
-            content=slide_data.get("content", []),
-            speaker_notes=slide_data.get("speaker_notes", ""),
-            image=image,
-            duration_seconds=slide_data.get("duration_seconds", 60)
-        ))
+        fields = {**_SLIDE_DEFAULTS, **{key: slide_data[key] for key in _SLIDE_DEFAULTS if key in slide_data}}
+        img_data = slide_data.get("image")
+        fields["image"] = SlideImage(
+            **{**_IMAGE_DEFAULTS, **{key: img_data[key] for key in _IMAGE_DEFAULTS if key in img_data}}
+        ) if img_data else None
+        plan.slides.append(SlideContent(content=slide_data.get("content", []), **fields))
 
     print(f"Pla creat: {len(plan.slides)} diapositives, {len(plan.key_concepts)} conceptes clau")
     return plan
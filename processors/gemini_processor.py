@@ -3,19 +3,28 @@ Processador d'imatges amb Gemini Flash.
 Descriu i etiqueta les imatges extretes del PDF.
 """
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 from pathlib import Path
-from typing import List
+from typing import List, Dict, Optional
 from dataclasses import dataclass
-import json
+import threading
 import time
 import base64
-
-from config import GOOGLE_API_KEY, GEMINI_ANALYSIS_MODEL
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import (
+    GOOGLE_API_KEY, GEMINI_ANALYSIS_MODEL, LLM_CACHE_TTL, IMAGE_BATCH_SIZE, IMAGE_BATCH_MAX_BYTES,
+    IMAGE_DESCRIBE_WORKERS, IMAGE_DESCRIBE_MAX_SIDE, IMAGE_DESCRIBE_JPEG_QUALITY,
+    MIN_DESCRIBE_PIXELS, MAX_DESCRIBE_ASPECT_RATIO
+)
 from extractors.image_extractor import ImageInfo
-from database import log_usage, get_api_keys
+from database import log_usage, get_api_keys, get_cached_response, save_cached_response
+from processors.ratelimit import google_limiter, estimate_tokens
+from processors.json_response import parse_json_response
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageCatalogEntry:
     """Entrada del catàleg d'imatges amb descripció."""
     id: str
@@ -30,13 +39,72 @@ class ImageCatalogEntry:
     relevance_score: float  # 0-1, utilitat per a presentació
 
 
+# Camps que Gemini ha de retornar per cada imatge
+IMAGE_DESCRIPTION_FIELDS = """{
+    "id": "Identificador de la imatge (exactament el que s'indica abans de cada imatge)",
+    "description": "DESCRIPCIÓ ULTRA-DETALLADA en català com si l'explicessis a una persona COMPLETAMENT CEGA. Inclou: TOTS els elements visuals visibles, colors exactes (tons, intensitats), formes geomètriques, text llegible (cita'l exactament), diagrames (descriu cada component, fletxes, connexions), gràfics (tipus, dades, eixos), taules (capçaleres, contingut), persones/objectes (posició, mida, relacions), estil artístic, composició, jerarquia visual. MINIM 8-10 frases completes i especifiques. No siguis vague - sigues concret i exhaustiu.",
+    "topic": "Tema principal específic (ex: 'matriu BCG amb quadrants de creixement', 'diagrama de flux del procés de planificació estratègica', 'gràfic de barres comparatiu d'estratègies'...)",
+    "image_type": "Tipus d'imatge específic: flowchart | bar_chart | pie_chart | matrix | timeline | organizational_chart | concept_map | table | illustration | photograph | screenshot",
+    "keywords": ["paraula_clau_1", "paraula_clau_2", "paraula_clau_3", "paraula_clau_4", "paraula_clau_5"],
+    "relevance_score": 0.8
+}"""
+
+# Versió del prompt de descripció: canviar-la invalida les descripcions guardades
+PROMPT_VERSION = "1"
+
+# Prompt de cada crida per lots, tret del nombre d'imatges (es construeix un sol cop)
+BATCH_PROMPT_BODY = f""" imatges d'un llibre d'administració d'empreses amb MÀXIMA PRECISIÓ i DETALL.
+Cada imatge va precedida del seu identificador.
+
+Respon NOMÉS amb un array JSON amb un objecte per imatge, en el mateix ordre, amb els següents camps:
+
+{IMAGE_DESCRIPTION_FIELDS}
+
+IMPORTANT: La descripció ha de ser TAN DETALLADA que Claude Opus pugui decidir amb precisió si aquesta imatge encaixa perfectament amb un contingut específic de presentació. Inclou dimensions relatives, posicions, colors RGB si és possible, text exacte, números, i qualsevol detall visual rellevant."""
+
+# Prefix de la clau de cache de les descripcions, ja resumit: per cada imatge
+# només cal copiar-lo i afegir-hi els bytes
+_CACHE_KEY_HASHER = hashlib.sha256(
+    f"{GEMINI_ANALYSIS_MODEL}\x00{PROMPT_VERSION}\x00{IMAGE_DESCRIPTION_FIELDS}\x00".encode("utf-8")
+)
+
+# Hash perceptual (dHash) per detectar la mateixa figura amb bytes diferents.
+# Amb 32x32 (1024 bits) una reexportació JPEG difereix en ~4 bits i dues taules
+# diferents amb la mateixa maquetació en ~17: el llindar queda entremig, a prop
+# de les còpies
+DHASH_SIZE = 32
+DHASH_MAX_DISTANCE = 6  # bits diferents
+
+# Tokens aproximats que Gemini compta per cada imatge d'entrada
+IMAGE_TOKEN_ESTIMATE = 258
+
+# Si una crida per lots triga més d'això (segons), es redueix la mida del lot
+BATCH_LATENCY_TARGET = 8.0
+
+# Un model (amb el seu client i canal gRPC) per API key, reutilitzat entre crides
+_models: Dict[str, genai.GenerativeModel] = {}
+_models_lock = threading.Lock()
+
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
+
 def describe_images(
     images: List[ImageInfo],
     session_id: str = "default",
     api_key: str = None
 ) -> List[ImageCatalogEntry]:
     """
-    Descriu i etiqueta cada imatge utilitzant Gemini Flash.
+    Descriu i etiqueta les imatges utilitzant Gemini Flash.
+
+    Les imatges s'envien en lots (IMAGE_BATCH_SIZE per crida) i Gemini retorna
+    un array JSON amb una descripció per imatge. Fins a IMAGE_DESCRIBE_WORKERS
+    lots es processen alhora: cada lot que acaba deixa lloc al següent.
 
     Args:
         images: Llista d'imatges extretes del PDF.
@@ -49,102 +117,112 @@ def describe_images(
     if not images:
         return []
 
-    # Configurar Google AI Studio amb API key
     effective_api_key = api_key or get_api_keys().get("google") or GOOGLE_API_KEY
-    genai.configure(api_key=effective_api_key)
+    model = _get_model(effective_api_key)
 
     total_input_tokens = 0
     total_output_tokens = 0
 
-    # Crear model per anàlisi d'imatges
-    model = genai.GenerativeModel(model_name=GEMINI_ANALYSIS_MODEL)
-
-    catalog: List[ImageCatalogEntry] = []
+    descriptions: Dict[str, dict] = {}
+    pending = []  # (imatge, mime_type, bytes, clau de cache)
+    duplicates: Dict[str, List[ImageInfo]] = {}  # clau de cache -> imatges iguals a la que es descriu
+    representatives: List[tuple] = []  # (dHash, clau de cache) de cada imatge que es descriu
 
+    # Imatges massa petites o allargades per ser útils: relevància 0 sense cridar l'API
+    to_describe = []
     for img in images:
-        try:
-            # Llegir imatge com a bytes
-            with open(img.path, "rb") as f:
-                image_bytes = f.read()
-
-            # Determinar mime type
-            ext = img.format.lower()
-            mime_map = {
-                'png': 'image/png',
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'gif': 'image/gif',
-                'webp': 'image/webp'
-            }
-            mime_type = mime_map.get(ext, 'image/png')
-
-            # Prompt per descriure la imatge
-            prompt = """Analitza aquesta imatge d'un llibre d'administració d'empreses amb MÀXIMA PRECISIÓ i DETALL.
-
-Respon en format JSON amb els següents camps:
-
-{
-    "description": "DESCRIPCIÓ ULTRA-DETALLADA en català com si l'explicessis a una persona COMPLETAMENT CEGA. Inclou: TOTS els elements visuals visibles, colors exactes (tons, intensitats), formes geomètriques, text llegible (cita'l exactament), diagrames (descriu cada component, fletxes, connexions), gràfics (tipus, dades, eixos), taules (capçaleres, contingut), persones/objectes (posició, mida, relacions), estil artístic, composició, jerarquia visual. MINIM 8-10 frases completes i especifiques. No siguis vague - sigues concret i exhaustiu.",
-    "topic": "Tema principal específic (ex: 'matriu BCG amb quadrants de creixement', 'diagrama de flux del procés de planificació estratègica', 'gràfic de barres comparatiu d'estratègies'...)",
-    "image_type": "Tipus d'imatge específic: flowchart | bar_chart | pie_chart | matrix | timeline | organizational_chart | concept_map | table | illustration | photograph | screenshot",
-    "keywords": ["paraula_clau_1", "paraula_clau_2", "paraula_clau_3", "paraula_clau_4", "paraula_clau_5"],
-    "relevance_score": 0.8
-}
+        if _worth_describing(img):
+            to_describe.append(img)
+        else:
+            descriptions[img.id] = {"relevance_score": 0.0}
+    if len(to_describe) < len(images):
+        print(f"  {len(images) - len(to_describe)} imatges descartades per mida o proporció")
+
+    workers = max(1, IMAGE_DESCRIBE_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Llegir, resumir i reduir els fitxers en paral·lel (cada ruta un sol cop)
+        paths = list(dict.fromkeys(img.path for img in to_describe))
+        read_results = dict(zip(paths, executor.map(_read_image, paths)))
+
+        for img in to_describe:
+            image_bytes, mime_type, cache_key, dhash = read_results[img.path]
+            if image_bytes is None:
+                continue
+            mime_type = mime_type or MIME_TYPES.get(img.format.lower(), 'image/png')
+
+            # La mateixa figura repetida en diverses pàgines (encara que es
+            # reexporti amb bytes diferents) només es descriu un cop
+            if dhash is not None:
+                cache_key = _find_representative(representatives, dhash, cache_key)
+            if cache_key in duplicates:
+                duplicates[cache_key].append(img)
+                continue
+
+            data = get_cached_response("describe_image", cache_key, LLM_CACHE_TTL)
+            if data is not None:
+                descriptions[img.id] = data
+                print(f"  Processada: {img.id} - {data.get('topic', 'N/A')} (cache)")
+            else:
+                pending.append((img, mime_type, image_bytes, cache_key))
+                duplicates[cache_key] = []
+
+        # Sempre hi ha fins a IMAGE_DESCRIBE_WORKERS lots en curs: quan n'acaba un
+        # s'envia el següent (el ritme el controla google_limiter)
+        batch_size = max(1, IMAGE_BATCH_SIZE)
+        start = 0
+        in_flight = {}  # future -> lot
+        while start < len(pending) or in_flight:
+            while start < len(pending) and len(in_flight) < workers:
+                batch = _next_batch(pending, start, batch_size)
+                start += len(batch)
+                in_flight[executor.submit(_describe_batch, model, batch)] = batch
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    results, input_tokens, output_tokens, elapsed = future.result()
+                except Exception as e:
+                    print(f"  Error processant lot de {len(batch)} imatges: {e}")
+                    continue
+
+                total_input_tokens += input_tokens
+                total_output_tokens += output_tokens
+
+                for img, _, _, cache_key in batch:
+                    data = results.get(img.id)
+                    if data is None:
+                        print(f"  Sense descripció per {img.id}")
+                        continue
+                    descriptions[img.id] = data
+                    save_cached_response("describe_image", cache_key, data)
+                    print(f"  Processada: {img.id} - {data.get('topic', 'N/A')}")
+                    for duplicate in duplicates[cache_key]:
+                        descriptions[duplicate.id] = data
+                        print(f"  Processada: {duplicate.id} - {data.get('topic', 'N/A')} (repetida de {img.id})")
+
+                # Lot massa lent: reduir la mida per als següents (els lots
+                # més grans enviats abans de reduir-la no la tornen a reduir)
+                if elapsed > BATCH_LATENCY_TARGET and 1 < len(batch) <= batch_size:
+                    batch_size = max(1, batch_size // 2)
+                    print(f"  Lot lent ({elapsed:.1f}s). Mida de lot reduïda a {batch_size}")
 
-IMPORTANT: La descripció ha de ser TAN DETALLADA que Claude Opus pugui decidir amb precisió si aquesta imatge encaixa perfectament amb un contingut específic de presentació. Inclou dimensions relatives, posicions, colors RGB si és possible, text exacte, números, i qualsevol detall visual rellevant."""
-
-            # Crear contingut amb imatge
-            response = model.generate_content([prompt, {"mime_type": mime_type, "data": image_bytes}])
-
-            # Registrar tokens (si disponible)
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                total_input_tokens += getattr(response.usage_metadata, 'prompt_token_count', 0)
-                total_output_tokens += getattr(response.usage_metadata, 'candidates_token_count', 0)
-
-            # Parsejar resposta JSON
-            response_text = response.text.strip()
-            # Netejar possibles marques de codi
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-            response_text = response_text.strip()
-
-            data = json.loads(response_text)
-
-            catalog.append(ImageCatalogEntry(
-                id=img.id,
-                path=img.path,
-                width=img.width,
-                height=img.height,
-                page_number=img.page_number,
-                description=data.get("description", "Sense descripció"),
-                topic=data.get("topic", "General"),
-                image_type=data.get("image_type", "illustration"),
-                keywords=data.get("keywords", []),
-                relevance_score=float(data.get("relevance_score", 0.5))
-            ))
-
-            print(f"  Processada: {img.id} - {data.get('topic', 'N/A')}")
-
-            # Petit delay per evitar rate limits
-            time.sleep(0.5)
-
-        except Exception as e:
-            print(f"  Error processant {img.id}: {e}")
-            # Afegir amb descripció per defecte
-            catalog.append(ImageCatalogEntry(
-                id=img.id,
-                path=img.path,
-                width=img.width,
-                height=img.height,
-                page_number=img.page_number,
-                description="Imatge del capítol",
-                topic="General",
-                image_type="illustration",
-                keywords=[],
-                relevance_score=0.5
-            ))
+    catalog: List[ImageCatalogEntry] = []
+    for img in images:
+        # Imatges sense descripció: afegir amb descripció per defecte
+        data = descriptions.get(img.id, {})
+        catalog.append(ImageCatalogEntry(
+            id=img.id,
+            path=img.path,
+            width=img.width,
+            height=img.height,
+            page_number=img.page_number,
+            description=data.get("description", "Imatge del capítol"),
+            topic=data.get("topic", "General"),
+            image_type=data.get("image_type", "illustration"),
+            keywords=data.get("keywords", []),
+            relevance_score=float(data.get("relevance_score", 0.5))
+        ))
 
     # Registrar ús total
     if total_input_tokens > 0 or total_output_tokens > 0:
@@ -162,6 +240,265 @@ IMPORTANT: La descripció ha de ser TAN DETALLADA que Claude Opus pugui decidir
     return catalog
 
 
+def _next_batch(pending: list, start: int, batch_size: int) -> list:
+    """
+    Agafa el següent lot d'imatges pendents sense passar de la mida de petició.
+
+    Args:
+        pending: Llista de (imatge, mime_type, bytes, clau de cache).
+        start: Primera imatge del lot.
+        batch_size: Nombre màxim d'imatges del lot.
+
+    Returns:
+        El lot (com a mínim una imatge, encara que sola ja passi del límit).
+    """
+    end = min(start + batch_size, len(pending))
+    total_bytes = len(pending[start][2])
+    for index in range(start + 1, end):
+        total_bytes += len(pending[index][2])
+        if total_bytes > IMAGE_BATCH_MAX_BYTES:
+            end = index
+            break
+    return pending[start:end]
+
+
+def _get_model(api_key: str) -> genai.GenerativeModel:
+    """
+    Retorna el model d'anàlisi d'imatges per a una API key.
+
+    genai.configure() és global i cada crida crea clients nous: es fa només el
+    primer cop per cada clau, i el client es lliga al model en aquell moment
+    perquè una altra tasca amb una altra clau no el pugui canviar.
+
+    Args:
+        api_key: API key de Google AI Studio.
+
+    Returns:
+        Model de Gemini per analitzar imatges.
+    """
+    with _models_lock:
+        model = _models.get(api_key)
+        if model is None:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(model_name=GEMINI_ANALYSIS_MODEL)
+            model._client = genai_client.get_default_generative_client()
+            _models[api_key] = model
+    return model
+
+
+def _worth_describing(img: ImageInfo) -> bool:
+    """Indica si la imatge té prou mida i una proporció raonable per descriure-la."""
+    if img.width * img.height < MIN_DESCRIBE_PIXELS:
+        return False
+    return max(img.width, img.height) / max(1, min(img.width, img.height)) <= MAX_DESCRIBE_ASPECT_RATIO
+
+
+def _read_image(path: Path) -> tuple:
+    """
+    Llegeix una imatge i en prepara l'enviament, la clau de cache i el hash perceptual.
+
+    Les imatges són deterministes: els mateixos bytes tenen la mateixa
+    descripció, així que la clau depèn del contingut original i no de la ruta.
+
+    Args:
+        path: Ruta de la imatge.
+
+    Returns:
+        Tupla (bytes a enviar, mime_type o None si no canvia, clau de cache, dHash),
+        o (None, None, None, None) si no es pot llegir.
+    """
+    try:
+        image_bytes = Path(path).read_bytes()
+    except OSError as e:
+        print(f"  Error llegint {path}: {e}")
+        return None, None, None, None
+    hasher = _CACHE_KEY_HASHER.copy()
+    hasher.update(image_bytes)
+    payload, mime_type, dhash = _prepare_image(image_bytes)
+    return payload, mime_type, hasher.hexdigest(), dhash
+
+
+def _prepare_image(image_bytes: bytes) -> tuple:
+    """
+    Redueix una imatge gran per enviar-la i en calcula el dHash (una sola descodificació).
+
+    Gemini redimensiona les imatges internament: més enllà de
+    IMAGE_DESCRIBE_MAX_SIDE píxels només s'envien més bytes i més tokens.
+
+    Args:
+        image_bytes: Contingut del fitxer d'imatge.
+
+    Returns:
+        Tupla (bytes a enviar, mime_type o None si són els originals, dHash).
+    """
+    from PIL import Image
+    import io
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            if max(img.size) <= IMAGE_DESCRIBE_MAX_SIDE:
+                return image_bytes, None, _dhash(img)
+
+            # Els JPEG es descodifiquen directament a una mida propera a l'objectiu
+            img.draft("RGB", (IMAGE_DESCRIBE_MAX_SIDE, IMAGE_DESCRIBE_MAX_SIDE))
+            reduced = _flatten(img)
+            reduced.thumbnail((IMAGE_DESCRIBE_MAX_SIDE, IMAGE_DESCRIBE_MAX_SIDE), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            reduced.save(buffer, "JPEG", quality=IMAGE_DESCRIBE_JPEG_QUALITY, optimize=True)
+            return buffer.getvalue(), "image/jpeg", _dhash(reduced)
+    except Exception:
+        # PIL no la sap llegir: s'envia tal qual i només es deduplica per bytes
+        return image_bytes, None, None
+
+
+def _flatten(img):
+    """Converteix la imatge a RGB posant les zones transparents sobre blanc."""
+    from PIL import Image
+
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _find_representative(representatives: List[tuple], dhash: int, cache_key: str) -> str:
+    """
+    Busca una imatge ja vista amb un hash perceptual gairebé igual.
+
+    Args:
+        representatives: (dHash, clau de cache) de les imatges ja vistes (s'hi afegeix la nova).
+        dhash: Hash perceptual de la imatge.
+        cache_key: Clau de cache de la imatge.
+
+    Returns:
+        La clau de la imatge equivalent, o la pròpia si és nova.
+    """
+    for other_hash, other_key in representatives:
+        if (other_hash ^ dhash).bit_count() <= DHASH_MAX_DISTANCE:
+            return other_key
+    representatives.append((dhash, cache_key))
+    return cache_key
+
+
+def _dhash(img) -> Optional[int]:
+    """
+    Hash perceptual per diferències (dHash) d'una imatge.
+
+    Compara cada píxel amb el del costat en una miniatura en escala de grisos:
+    la mateixa figura amb una altra compressió o resolució dona el mateix hash.
+
+    Args:
+        img: Imatge de PIL.
+
+    Returns:
+        Hash de DHASH_SIZE² bits, o None si la imatge és plana.
+    """
+    from PIL import Image
+
+    pixels = list(
+        img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BILINEAR, reducing_gap=2.0).getdata()
+    )
+
+    bits = 0
+    for row in range(DHASH_SIZE):
+        offset = row * (DHASH_SIZE + 1)
+        for col in range(DHASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    # Una imatge plana dona 0: no té res per distingir-la d'una altra imatge plana
+    return bits or None
+
+
+def _describe_batch(model, batch: list):
+    """
+    Descriu un lot d'imatges amb una sola crida a Gemini.
+
+    Args:
+        model: Model de Gemini.
+        batch: Llista de (imatge, mime_type, bytes, clau de cache).
+
+    Returns:
+        Tupla (descripcions per id, tokens d'entrada, tokens de sortida, segons).
+    """
+    contents = _build_batch_contents(batch)
+    estimated_tokens = estimate_tokens(contents[0]) + IMAGE_TOKEN_ESTIMATE * len(batch)
+
+    started_at = time.monotonic()
+    response = google_limiter.call(model.generate_content, contents, estimated_tokens=estimated_tokens)
+
+    # Registrar tokens (si disponible)
+    input_tokens = output_tokens = 0
+    if hasattr(response, 'usage_metadata') and response.usage_metadata:
+        input_tokens = getattr(response.usage_metadata, 'prompt_token_count', 0)
+        output_tokens = getattr(response.usage_metadata, 'candidates_token_count', 0)
+
+    results = _parse_batch_response(response.text, [item[0].id for item in batch])
+    return results, input_tokens, output_tokens, time.monotonic() - started_at
+
+
+def _build_batch_contents(batch: list) -> list:
+    """
+    Construeix el contingut d'una crida amb diverses imatges.
+
+    Args:
+        batch: Llista de (imatge, mime_type, bytes, clau de cache).
+
+    Returns:
+        Llista de parts (text i imatges) per a generate_content.
+    """
+    contents = [f"Analitza aquestes {len(batch)}{BATCH_PROMPT_BODY}"]
+    for img, mime_type, image_bytes, _ in batch:
+        contents.append(f"IMATGE id={img.id}")
+        contents.append({"mime_type": mime_type, "data": image_bytes})
+    return contents
+
+
+def _parse_batch_response(response_text: str, image_ids: List[str]) -> Dict[str, dict]:
+    """
+    Parseja l'array JSON retornat per Gemini i l'assigna a cada imatge.
+
+    Args:
+        response_text: Text de la resposta.
+        image_ids: IDs de les imatges del lot, en ordre.
+
+    Returns:
+        Diccionari id -> descripció.
+    """
+    data = parse_json_response(response_text)
+    if isinstance(data, dict):
+        data = [data]
+
+    results = {}
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        # Assignar per ID; si Gemini no el retorna bé, per posició
+        img_id = item.get("id")
+        if img_id not in image_ids:
+            if index >= len(image_ids):
+                continue
+            img_id = image_ids[index]
+        results.setdefault(img_id, item)
+    return results
+
+
+# Parts fixes del text del catàleg
+CATALOG_SEPARATOR = "─" * 65
+CATALOG_HEADER = f"""{"═" * 63}
+CATÀLEG D'IMATGES DEL LLIBRE (%d imatges disponibles)
+{"═" * 63}
+
+PRIORITAT: Usa imatges del catàleg si encaixen PERFECTAMENT.
+Els esquemes i diagrames del llibre són valuosos per coherència acadèmica.
+
+{CATALOG_SEPARATOR}"""
+CATALOG_FOOTER = """
+RECORDATORI: Només usa 'catalog' si la imatge encaixa EXACTAMENT amb el contingut de la diapositiva.
+Si no hi ha cap imatge adequada, genera una nova amb 'generate'.
+"""
+
+
 def catalog_to_text(catalog: List[ImageCatalogEntry]) -> str:
     """
     Converteix el catàleg d'imatges a text per enviar a Opus.
@@ -179,36 +516,22 @@ CATÀLEG D'IMATGES DEL LLIBRE: BUIT
 No s'han trobat imatges al PDF. Hauràs de generar totes les imatges.
 Usa "source": "generate" per a totes les diapositives que necessitin imatge."""
 
-    lines = [
-        "═══════════════════════════════════════════════════════════════",
-        f"CATÀLEG D'IMATGES DEL LLIBRE ({len(catalog)} imatges disponibles)",
-        "═══════════════════════════════════════════════════════════════",
-        "",
-        "PRIORITAT: Usa imatges del catàleg si encaixen PERFECTAMENT.",
-        "Els esquemes i diagrames del llibre són valuosos per coherència acadèmica.",
-        "",
-        "─────────────────────────────────────────────────────────────────"
-    ]
-
+    blocks = [CATALOG_HEADER % len(catalog)]
     for i, entry in enumerate(catalog, 1):
         quality_indicator = "★★★" if entry.relevance_score >= 0.8 else "★★" if entry.relevance_score >= 0.6 else "★"
-        lines.append(f"")
-        lines.append(f"[IMATGE {i}] ID: {entry.id}  {quality_indicator} ({entry.relevance_score:.1f}/1.0)")
-        lines.append(f"├── Pàgina PDF: {entry.page_number}")
-        lines.append(f"├── Tipus: {entry.image_type}")
-        lines.append(f"├── Tema específic: {entry.topic}")
-        lines.append(f"├── Keywords: {', '.join(entry.keywords)}")
-        lines.append(f"└── DESCRIPCIÓ VISUAL COMPLETA:")
-        # Dividir descripció en línies per millor llegibilitat
-        desc_lines = entry.description.split('. ')
-        for desc_line in desc_lines:
-            if desc_line.strip():
-                lines.append(f"    {desc_line.strip()}.")
-        lines.append(f"─────────────────────────────────────────────────────────────────")
-
-    lines.append("")
-    lines.append("RECORDATORI: Només usa 'catalog' si la imatge encaixa EXACTAMENT amb el contingut de la diapositiva.")
-    lines.append("Si no hi ha cap imatge adequada, genera una nova amb 'generate'.")
-    lines.append("")
-
-    return "\n".join(lines)
+        # Descripció dividida en frases per millor llegibilitat
+        description = "".join(
+            f"\n    {sentence}." for sentence in map(str.strip, entry.description.split('. ')) if sentence
+        )
+        blocks.append(
+            f"\n[IMATGE {i}] ID: {entry.id}  {quality_indicator} ({entry.relevance_score:.1f}/1.0)\n"
+            f"├── Pàgina PDF: {entry.page_number}\n"
+            f"├── Tipus: {entry.image_type}\n"
+            f"├── Tema específic: {entry.topic}\n"
+            f"├── Keywords: {', '.join(entry.keywords)}\n"
+            f"└── DESCRIPCIÓ VISUAL COMPLETA:{description}\n"
+            f"{CATALOG_SEPARATOR}"
+        )
+    blocks.append(CATALOG_FOOTER)
+
+    return "\n".join(blocks)
@@ -5,19 +5,47 @@ Genera imatges noves per a les diapositives que ho necessitin.
 from google import genai
 from google.genai import types
 from pathlib import Path
-from typing import List
+from typing import Dict, List
+import hashlib
+import logging
+import os
+import shutil
+import threading
 import time
-import uuid
-import base64
+from binascii import a2b_base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from secrets import token_hex
 
-from config import GOOGLE_API_KEY, GEMINI_IMAGE_MODEL, IMAGES_GENERATED_DIR
+from config import GOOGLE_API_KEY, GEMINI_IMAGE_MODEL, IMAGES_GENERATED_DIR, IMAGE_GENERATE_WORKERS
 from processors.content_processor import PresentationPlan, SlideImage
 from processors.gemini_processor import ImageCatalogEntry
 from database import log_usage, get_api_keys
+from processors.ratelimit import image_limiter, estimate_tokens, retry_wait
+
+logger = logging.getLogger(__name__)
 
 # Configuració de retry per generació d'imatges
 MAX_IMAGE_RETRIES = 3
-IMAGE_RETRY_DELAY = 5  # segons
+IMAGE_RETRY_DELAY = 2  # segons (es duplica a cada intent, amb jitter)
+
+# Mida dels trossos en copiar una imatge que arriba com a stream
+IMAGE_COPY_CHUNK_SIZE = 64 * 1024
+
+# Estil corporatiu consistent per a totes les imatges
+IMAGE_STYLE_PREFIX = "Professional business presentation illustration, modern flat design style, "
+IMAGE_STYLE_SUFFIX = (
+    ". Corporate color palette: warm orange (#E07A2F) as primary color, "
+    "complementary yellow (#F5A623), neutral gray (#4A4A4A), white background. "
+    "Clean vector art style, no gradients, minimal shadows, geometric shapes. "
+    "High quality, suitable for PowerPoint presentation. "
+    "NO text, NO words, NO letters in the image. "
+    "16:9 aspect ratio, centered composition."
+)
+
+# Un client per API key, compartit entre presentacions: les connexions HTTP es reutilitzen
+_clients: Dict[str, genai.Client] = {}
+_clients_lock = threading.Lock()
 
 
 def generate_missing_images(
@@ -45,143 +73,256 @@ def generate_missing_images(
 
     # Configurar client Google AI Studio (nova API gen-ai)
     effective_api_key = api_key or get_api_keys().get("google") or GOOGLE_API_KEY
-    client = genai.Client(api_key=effective_api_key)
+    with _clients_lock:
+        client = _clients.get(effective_api_key)
+        if client is None:
+            client = _clients[effective_api_key] = genai.Client(api_key=effective_api_key)
 
     images_generated_count = 0
 
-    # Crear diccionari del catàleg per accés ràpid
-    catalog_dict = {entry.id: entry for entry in image_catalog}
+    # Diccionari del catàleg per accés ràpid: només si alguna slide en fa servir una imatge.
+    # No es guarda entre crides: el catàleg és una llista mutable i una cache
+    # per identitat podria quedar desfasada
+    image_slides = [slide for slide in plan.slides if slide.image is not None]
+    uses_catalog = any(slide.image.source == "catalog" for slide in image_slides)
+    catalog_dict = {entry.id: entry for entry in image_catalog} if uses_catalog else {}
 
     images_to_generate = []
-    catalog_images = []
-
-    # Classificar imatges
-    for slide in plan.slides:
-        if slide.image is None:
-            continue
-
-        if slide.image.source == "catalog":
-            if slide.image.catalog_id and slide.image.catalog_id in catalog_dict:
-                slide.image.path = str(catalog_dict[slide.image.catalog_id].path)
-                catalog_images.append(slide.number)
+    to_generate = images_to_generate.append
+    catalog_count = 0
+
+    # Classificar imatges (només les slides que en tenen)
+    for slide in image_slides:
+        image = slide.image
+        if image.source == "catalog":
+            entry = catalog_dict.get(image.catalog_id) if image.catalog_id else None
+            if entry is not None:
+                image.path = str(entry.path)
+                catalog_count += 1
             else:
                 # ID no trobat, convertir a generació
-                slide.image.source = "generate"
-                slide.image.generate_prompt = f"Professional flat design business illustration for presentation slide about {slide.title}, orange and gray corporate colors"
-                images_to_generate.append(slide)
-        elif slide.image.source == "generate":
-            images_to_generate.append(slide)
+                image.source = "generate"
+                image.generate_prompt = f"Professional flat design business illustration for presentation slide about {slide.title}, orange and gray corporate colors"
+                to_generate(slide)
+        elif image.source == "generate":
+            to_generate(slide)
+
+    logger.info(f"  Imatges del catàleg: {catalog_count}")
+    logger.info(f"  Imatges a generar: {len(images_to_generate)}")
+
+    # Les slides amb el mateix prompt (per exemple, els fallbacks del catàleg
+    # amb el mateix títol) comparteixen una sola imatge generada
+    groups: Dict[str, List] = {}
+    for slide in images_to_generate:
+        if slide.image.generate_prompt:
+            groups.setdefault(slide.image.generate_prompt, []).append(slide)
+
+    # Imatges ja generades en execucions anteriors amb el mateix prompt
+    cache_dir = output_dir / ".prompt_cache"
+    cache_dir.mkdir(exist_ok=True)
+    cache_paths = {prompt: _prompt_cache_path(cache_dir, prompt) for prompt in groups}
+    cached_count = 0
+    for prompt in list(groups):
+        cached = cache_paths[prompt]
+        if cached.exists():
+            for slide in groups.pop(prompt):
+                slide.image.path = str(cached)
+                cached_count += 1
+    if cached_count:
+        logger.info(f"  Imatges de la cache (mateix prompt): {cached_count}")
+
+    # Generar imatges noves amb Gemini 3 Pro Image Preview (Nano Banana). Cada
+    # crida passa bona part del temps esperant la xarxa: es fan en paral·lel i
+    # el ritme el controla image_limiter. Cada fil escriu només a la primera
+    # slide del seu grup
+    if groups:
+        workers = max(1, min(IMAGE_GENERATE_WORKERS, len(groups)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda group: _generate_slide_image(client, group[0], output_dir),
+                groups.values()
+            ))
+        images_generated_count = sum(results)
+
+        reused_count = 0
+        for generated, (prompt, (first, *rest)) in zip(results, groups.items()):
+            if generated:
+                _save_to_prompt_cache(Path(first.image.path), cache_paths[prompt])
+                for slide in rest:
+                    slide.image.path = first.image.path
+                reused_count += len(rest)
+        if reused_count:
+            logger.info(f"  Imatges reutilitzades (mateix prompt): {reused_count}")
 
-    print(f"  Imatges del catàleg: {len(catalog_images)}")
-    print(f"  Imatges a generar: {len(images_to_generate)}")
+    # Registrar ús de generació d'imatges
+    if images_generated_count > 0:
+        cost = log_usage(
+            session_id=session_id,
+            model=GEMINI_IMAGE_MODEL,
+            images_generated=images_generated_count,
+            operation="image_generation",
+            chapter_name=plan.chapter_name
+        )
+        logger.info(f"  Imatges generades: {images_generated_count} | Cost: ${cost:.4f}")
 
-    # Generar imatges noves amb Gemini 3 Pro Image Preview (Nano Banana)
-    for slide in images_to_generate:
-        if not slide.image or not slide.image.generate_prompt:
-            continue
+    return plan
+
+
+def _generate_slide_image(client: genai.Client, slide, output_dir: Path) -> bool:
+    """
+    Genera i desa la imatge d'una diapositiva (amb reintents).
+
+    Args:
+        client: Client de Google AI Studio.
+        slide: Diapositiva amb el prompt d'imatge (se li assigna el path).
+        output_dir: Directori on guardar la imatge.
+
+    Returns:
+        True si s'ha generat la imatge.
+    """
+    try:
+        logger.info(f"  Generant imatge per slide {slide.number}: {slide.title[:40]}...")
 
-        try:
-            print(f"  Generant imatge per slide {slide.number}: {slide.title[:40]}...")
+        # Millorar el prompt amb estil consistent
+        enhanced_prompt = enhance_image_prompt(slide.image.generate_prompt)
 
-            # Millorar el prompt amb estil consistent
-            enhanced_prompt = enhance_image_prompt(slide.image.generate_prompt)
+        # Generar imatge amb Gemini 3 Pro Image Preview via Google AI Studio
+        image_generated = False
+        last_error = None
 
-            # Generar imatge amb Gemini 3 Pro Image Preview via Google AI Studio
-            image_generated = False
-            last_error = None
+        # Usar generate_content per models Gemini amb capacitat d'imatge
+        contents = f"Generate an image: {enhanced_prompt}"
 
-            for attempt in range(MAX_IMAGE_RETRIES):
-                try:
-                    # Usar generate_content per models Gemini amb capacitat d'imatge
+        for attempt in range(MAX_IMAGE_RETRIES):
+            try:
+                # reserve() i no call(): els 429 es reintenten en aquest bucle,
+                # amb un sol backoff
+                with image_limiter.reserve(estimated_tokens=estimate_tokens(contents)):
                     response = client.models.generate_content(
                         model=GEMINI_IMAGE_MODEL,
-                        contents=f"Generate an image: {enhanced_prompt}",
+                        contents=contents,
                         config=types.GenerateContentConfig(
                             response_modalities=["IMAGE"],
                             temperature=0.7,
                         )
                     )
 
-                    # Extreure imatge de la resposta
-                    if response.candidates and len(response.candidates) > 0:
-                        candidate = response.candidates[0]
-                        if candidate.content and candidate.content.parts:
-                            for part in candidate.content.parts:
-                                if hasattr(part, 'inline_data') and part.inline_data:
-                                    # Guardar imatge
-                                    img_id = f"gen_{slide.number}_{uuid.uuid4().hex[:8]}"
-                                    img_path = output_dir / f"{img_id}.png"
-
-                                    # Extreure bytes de la imatge
-                                    image_bytes = part.inline_data.data
-                                    if isinstance(image_bytes, str):
-                                        image_bytes = base64.b64decode(image_bytes)
-
-                                    with open(img_path, "wb") as f:
-                                        f.write(image_bytes)
-
-                                    slide.image.path = str(img_path)
-                                    print(f"    ✓ Guardada: {img_path.name}")
-                                    image_generated = True
-                                    images_generated_count += 1
-                                    break
-
-                    if image_generated:
-                        break
-                    else:
-                        last_error = "No s'ha trobat imatge a la resposta"
-
-                except Exception as e:
-                    last_error = str(e)
-                    if attempt < MAX_IMAGE_RETRIES - 1:
-                        print(f"    Reintentant... ({attempt + 1}/{MAX_IMAGE_RETRIES})")
-                        time.sleep(IMAGE_RETRY_DELAY)
-
-            if not image_generated:
-                print(f"    ✗ Error: {last_error}")
-
-            # Delay entre generacions per evitar rate limits
-            time.sleep(1.5)
-
-        except Exception as e:
-            print(f"    ✗ Error generant imatge per slide {slide.number}: {str(e)}")
+                # Extreure imatge de la resposta
+                if response.candidates:
+                    candidate = response.candidates[0]
+                    if candidate.content and candidate.content.parts:
+                        for part in candidate.content.parts:
+                            inline_data = getattr(part, "inline_data", None)
+                            if not inline_data:
+                                continue
 
-    # Registrar ús de generació d'imatges
-    if images_generated_count > 0:
-        cost = log_usage(
-            session_id=session_id,
-            model=GEMINI_IMAGE_MODEL,
-            images_generated=images_generated_count,
-            operation="image_generation",
-            chapter_name=plan.chapter_name
-        )
-        print(f"  Imatges generades: {images_generated_count} | Cost: ${cost:.4f}")
+                            # Guardar imatge
+                            img_id = f"gen_{slide.number}_{token_hex(4)}"
+                            img_path = output_dir / f"{img_id}.png"
 
-    return plan
+                            _write_image(inline_data, img_path)
+
+                            slide.image.path = str(img_path)
+                            logger.info(f"    ✓ Guardada: {img_path.name}")
+                            image_generated = True
+                            break
+
+                if image_generated:
+                    break
+                else:
+                    last_error = "No s'ha trobat imatge a la resposta"
+
+            except Exception as e:
+                last_error = str(e)
+                if attempt < MAX_IMAGE_RETRIES - 1:
+                    # Backoff exponencial (o el Retry-After de l'API) només després d'un error
+                    wait_time = retry_wait(e, IMAGE_RETRY_DELAY * (2 ** attempt))
+                    logger.warning(f"    Reintentant en {wait_time:.1f}s... ({attempt + 1}/{MAX_IMAGE_RETRIES})")
+                    time.sleep(wait_time)
+
+        if not image_generated:
+            logger.warning(f"    ✗ Error: {last_error}")
+
+        return image_generated
+
+    except Exception as e:
+        logger.warning(f"    ✗ Error generant imatge per slide {slide.number}: {str(e)}")
+        return False
+
+
+def _prompt_cache_path(cache_dir: Path, prompt: str) -> Path:
+    """
+    Ruta de la cache d'una imatge generada.
+
+    La clau inclou el model i el prompt millorat (el que realment s'envia).
+
+    Args:
+        cache_dir: Directori de la cache.
+        prompt: Prompt base de la diapositiva.
+
+    Returns:
+        Ruta del PNG a la cache (pot no existir).
+    """
+    key = hashlib.sha256(f"{GEMINI_IMAGE_MODEL}\n{enhance_image_prompt(prompt)}".encode()).hexdigest()
+    return cache_dir / f"{key}.png"
 
 
+def _save_to_prompt_cache(img_path: Path, cached: Path):
+    """
+    Afegeix una imatge generada a la cache amb un hardlink (sense duplicar bytes).
+
+    Si el sistema de fitxers no admet hardlinks o la clau ja existeix
+    (una altra presentació l'ha desat alhora), la imatge no es desa.
+
+    Args:
+        img_path: Imatge generada.
+        cached: Ruta de la cache.
+    """
+    try:
+        os.link(img_path, cached)
+    except OSError:
+        pass
+
+
+def _write_image(inline_data, img_path: Path):
+    """
+    Desa al disc les dades d'imatge d'una resposta.
+
+    Si el SDK exposa les dades com a stream, es copien a trossos sense
+    carregar tota la imatge en memòria.
+
+    Args:
+        inline_data: Blob de la resposta (amb .data i, potser, .stream()).
+        img_path: Fitxer de destinació.
+    """
+    stream = getattr(inline_data, "stream", None)
+    if callable(stream):
+        with img_path.open("wb") as dst:
+            shutil.copyfileobj(stream(), dst, IMAGE_COPY_CHUNK_SIZE)
+        return
+
+    # El SDK ja sol donar els bytes descodificats; si arriben en base64,
+    # a2b_base64 els descodifica directament i ignora els salts de línia
+    image_bytes = inline_data.data
+    if isinstance(image_bytes, str):
+        image_bytes = a2b_base64(image_bytes)
+    img_path.write_bytes(image_bytes)
+
+
+@lru_cache(maxsize=256)
 def enhance_image_prompt(base_prompt: str) -> str:
     """
     Millora el prompt per obtenir imatges consistents amb l'estil.
 
+    Els prompts repetits entre diapositives retornen el mateix string ja construït.
+
     Args:
         base_prompt: Prompt base de l'usuari/Opus.
 
     Returns:
         Prompt millorat amb estil consistent.
     """
-    # Estil corporatiu consistent per a totes les imatges
-    style_prefix = "Professional business presentation illustration, modern flat design style, "
-    style_suffix = (
-        ". Corporate color palette: warm orange (#E07A2F) as primary color, "
-        "complementary yellow (#F5A623), neutral gray (#4A4A4A), white background. "
-        "Clean vector art style, no gradients, minimal shadows, geometric shapes. "
-        "High quality, suitable for PowerPoint presentation. "
-        "NO text, NO words, NO letters in the image. "
-        "16:9 aspect ratio, centered composition."
-    )
-
-    return f"{style_prefix}{base_prompt}{style_suffix}"
+    return "".join((IMAGE_STYLE_PREFIX, base_prompt, IMAGE_STYLE_SUFFIX))
 
 
 def get_placeholder_for_failed_generation(slide_title: str) -> str:
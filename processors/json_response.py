@@ -0,0 +1,54 @@
+"""
+Extracció del JSON de les respostes dels models.
+Tolera marques de codi (```json, ```JSON...) i text abans o després del JSON.
+"""
+import json
+import re
+
+# Bloc de codi markdown amb o sense etiqueta d'idioma
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*(.*?)\s*```", re.DOTALL)
+
+_decoder = json.JSONDecoder()
+
+
+def parse_json_response(response_text: str):
+    """
+    Parseja el JSON d'una resposta d'un model.
+
+    Prova primer el text sencer (el cas habitual), després el contingut del
+    primer bloc de codi i, finalment, el primer valor JSON que comenci dins
+    del text, ignorant el que hi hagi darrere.
+
+    Args:
+        response_text: Text de la resposta.
+
+    Returns:
+        L'objecte o array JSON parsejat.
+
+    Raises:
+        json.JSONDecodeError: Si la resposta no conté cap JSON vàlid.
+    """
+    text = response_text.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        error = e
+
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+
+    # Primer objecte o array del text: raw_decode s'atura al final del valor,
+    # així que el text posterior no molesta
+    starts = sorted(index for index in (text.find("{"), text.find("[")) if index >= 0)
+    for start in starts:
+        try:
+            return _decoder.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            continue
+
+    raise error
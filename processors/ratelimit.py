@@ -0,0 +1,208 @@
+"""
+Limitador de velocitat per proveïdor (Anthropic, Google).
+Token bucket de peticions i tokens per minut que es frena quan l'API respon 429.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from config import ANTHROPIC_RPM, ANTHROPIC_TPM, GOOGLE_RPM, GOOGLE_TPM, GEMINI_IMAGE_RPM
+
+# Reintents amb espera exponencial quan l'API respon 429
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_RETRY_DELAY = 2  # segons (es duplica a cada intent)
+RETRY_JITTER = 0.2  # ±20% perquè els fils que esperen alhora no reintentin alhora
+
+
+class RateLimiter:
+    """
+    Token bucket de peticions per minut (RPM) i tokens per minut (TPM).
+
+    El ritme de peticions es redueix a la meitat quan l'API respon 429 i es
+    recupera linealment fins al límit configurat en `recovery_time` segons
+    des de l'última reducció. La recuperació depèn només del temps: les
+    crides lentes (streaming, lots d'imatges) no la frenen. Una ràfega de
+    429 concurrents només el redueix un cop: els 429 de peticions enviades
+    abans de l'última reducció no la repeteixen.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int,
+        tpm: int,
+        recovery_time: float = 60.0,
+        decrease_factor: float = 0.5,
+        min_rpm: float = 1.0
+    ):
+        self.name = name
+        self.max_rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.recovery_time = recovery_time
+        self.decrease_factor = decrease_factor
+        self.min_rpm = min_rpm
+
+        self.rpm = float(rpm)
+        self._reduced_rpm = float(rpm)  # Ritme just després de l'última reducció
+        self._reduced_at = 0.0
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Reomple els buckets segons el temps transcorregut."""
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.rpm < self.max_rpm:
+            recovered = min(1.0, (now - self._reduced_at) / self.recovery_time)
+            self.rpm = self._reduced_rpm + (self.max_rpm - self._reduced_rpm) * recovered
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, estimated_tokens: int = 0):
+        """
+        Espera fins que hi hagi capacitat per a una petició.
+
+        Args:
+            estimated_tokens: Tokens estimats de la petició.
+        """
+        tokens = min(float(estimated_tokens), self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                )
+            time.sleep(max(wait, 0.05))
+
+    def on_rate_limited(self, sent_at: Optional[float] = None):
+        """
+        Redueix el ritme després d'un 429 (decrement multiplicatiu).
+
+        Args:
+            sent_at: Moment (time.monotonic) en què es va enviar la petició. Si
+                és anterior a l'última reducció, el 429 ja hi està comptat.
+        """
+        with self._lock:
+            if sent_at is not None and sent_at < self._reduced_at:
+                return
+            now = time.monotonic()
+            self._refill(now)
+            self.rpm = self._reduced_rpm = max(self.min_rpm, self.rpm * self.decrease_factor)
+            self._reduced_at = now
+            self._requests = min(self._requests, self.rpm)
+        print(f"  [{self.name}] Límit de velocitat: ritme reduït a {self.rpm:.0f} peticions/min")
+
+    @contextmanager
+    def reserve(self, estimated_tokens: int = 0):
+        """
+        Reserva capacitat per a una crida i redueix el ritme si l'API respon 429.
+
+        Args:
+            estimated_tokens: Tokens estimats de la petició.
+        """
+        self.acquire(estimated_tokens)
+        sent_at = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.on_rate_limited(sent_at)
+            raise
+
+    def call(self, func, *args, estimated_tokens: int = 0, **kwargs):
+        """
+        Executa una crida a l'API respectant el límit i reintentant els 429.
+
+        Args:
+            func: Funció que fa la crida.
+            estimated_tokens: Tokens estimats de la petició.
+
+        Returns:
+            El resultat de la crida.
+        """
+        for attempt in range(RATE_LIMIT_RETRIES):
+            try:
+                with self.reserve(estimated_tokens):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == RATE_LIMIT_RETRIES - 1:
+                    raise
+                wait_time = retry_wait(e, RATE_LIMIT_RETRY_DELAY * (2 ** attempt))
+                print(f"  [{self.name}] 429. Reintentant en {wait_time:.1f}s... (intent {attempt + 1}/{RATE_LIMIT_RETRIES})")
+                time.sleep(wait_time)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Indica si l'error és un 429 de qualsevol dels SDK.
+
+    Només es miren l'estat HTTP (status_code a anthropic, code a google-genai
+    i google.api_core) i el tipus d'error: el text del missatge pot contenir
+    "429" per altres motius (per exemple, un recompte de tokens).
+    """
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    return "ResourceExhausted" in type(error).__name__
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Segons d'espera que indica l'API a la resposta d'error (retry-after-ms o retry-after).
+
+    Returns:
+        Els segons indicats, o None si la resposta no en porta.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for header, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) / scale)
+        except ValueError:
+            continue  # Format data HTTP: es fa servir l'espera per defecte
+    return None
+
+
+def retry_wait(error: Exception, default: float, max_wait: Optional[float] = None) -> float:
+    """
+    Espera abans d'un reintent: la que indica l'API o la per defecte, amb jitter.
+
+    Args:
+        error: Error de la crida fallida.
+        default: Espera si l'API no n'indica cap (backoff exponencial).
+        max_wait: Espera màxima.
+
+    Returns:
+        Segons d'espera.
+    """
+    wait = retry_after(error)
+    if wait is None:
+        wait = default
+    if max_wait is not None:
+        wait = min(wait, max_wait)
+    return wait * random.uniform(1 - RETRY_JITTER, 1 + RETRY_JITTER)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimació ràpida de tokens (~4 caràcters per token)."""
+    return len(text) // 4
+
+
+# Límits compartits per tots els fils del procés
+anthropic_limiter = RateLimiter("anthropic", rpm=ANTHROPIC_RPM, tpm=ANTHROPIC_TPM)
+google_limiter = RateLimiter("google", rpm=GOOGLE_RPM, tpm=GOOGLE_TPM)
+# El model d'imatges té una quota separada de la dels models de text
+image_limiter = RateLimiter("google-image", rpm=GEMINI_IMAGE_RPM, tpm=GOOGLE_TPM)
@@ -2,28 +2,30 @@
 Configuració d'estils per a les presentacions PowerPoint.
 Basat en l'estil de les presentacions MENAG del màster.
 """
+from types import MappingProxyType
+
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 
 
-# Funció helper per compatibilitat
-def RgbColor(r, g, b):
-    """Crea un color RGB compatible amb python-pptx."""
-    return RGBColor(r, g, b)
+class StyleConfig:
+    """
+    Configuració d'estils per al PowerPoint.
 
+    Només conté constants de classe: no es crea cap instància.
+    """
 
-class StyleConfig:
-    """Configuració d'estils per al PowerPoint."""
+    __slots__ = ()
 
     # Colors principals (RGB)
-    ORANGE_PRIMARY = RgbColor(224, 122, 47)      # #E07A2F - Títols
-    ORANGE_DARK = RgbColor(180, 90, 30)          # #B45A1E - Accent fosc
-    BROWN = RgbColor(139, 90, 43)                # #8B5A2B - Franja inferior
-    GRAY_DARK = RgbColor(64, 64, 64)             # #404040 - Text principal
-    GRAY_LIGHT = RgbColor(128, 128, 128)         # #808080 - Text secundari
-    WHITE = RgbColor(255, 255, 255)              # #FFFFFF - Fons
-    BLACK = RgbColor(0, 0, 0)                    # #000000 - Text èmfasi
+    ORANGE_PRIMARY = RGBColor(224, 122, 47)      # #E07A2F - Títols
+    ORANGE_DARK = RGBColor(180, 90, 30)          # #B45A1E - Accent fosc
+    BROWN = RGBColor(139, 90, 43)                # #8B5A2B - Franja inferior
+    GRAY_DARK = RGBColor(64, 64, 64)             # #404040 - Text principal
+    GRAY_LIGHT = RGBColor(128, 128, 128)         # #808080 - Text secundari
+    WHITE = RGBColor(255, 255, 255)              # #FFFFFF - Fons
+    BLACK = RGBColor(0, 0, 0)                    # #000000 - Text èmfasi
 
     # Colors per a llistes numerades
     LIST_NUMBER_COLOR = ORANGE_PRIMARY
@@ -72,34 +74,42 @@ class StyleConfig:
 
     @classmethod
     def get_title_style(cls):
-        """Retorna configuració per a títols."""
-        return {
-            'font_name': cls.FONT_TITLE,
-            'font_size': cls.FONT_SIZE_SLIDE_TITLE,
-            'font_color': cls.ORANGE_PRIMARY,
-            'bold': False,
-            'alignment': PP_ALIGN.LEFT
-        }
+        """Retorna configuració per a títols (només lectura; copiar-la amb dict() per modificar-la)."""
+        return _TITLE_STYLE
 
     @classmethod
     def get_body_style(cls):
-        """Retorna configuració per a text del cos."""
-        return {
-            'font_name': cls.FONT_BODY,
-            'font_size': cls.FONT_SIZE_BODY,
-            'font_color': cls.GRAY_DARK,
-            'bold': False,
-            'alignment': PP_ALIGN.LEFT
-        }
+        """Retorna configuració per a text del cos (només lectura)."""
+        return _BODY_STYLE
 
     @classmethod
     def get_index_style(cls):
-        """Retorna configuració per a l'índex."""
-        return {
-            'font_name': cls.FONT_BODY,
-            'font_size': cls.FONT_SIZE_BODY,
-            'font_color': cls.GRAY_DARK,
-            'number_color': cls.ORANGE_PRIMARY,
-            'bold': False,
-            'alignment': PP_ALIGN.LEFT
-        }
+        """Retorna configuració per a l'índex (només lectura)."""
+        return _INDEX_STYLE
+
+
+# Estils precalculats un sol cop: els getters retornen sempre el mateix objecte
+_TITLE_STYLE = MappingProxyType({
+    'font_name': StyleConfig.FONT_TITLE,
+    'font_size': StyleConfig.FONT_SIZE_SLIDE_TITLE,
+    'font_color': StyleConfig.ORANGE_PRIMARY,
+    'bold': False,
+    'alignment': PP_ALIGN.LEFT
+})
+
+_BODY_STYLE = MappingProxyType({
+    'font_name': StyleConfig.FONT_BODY,
+    'font_size': StyleConfig.FONT_SIZE_BODY,
+    'font_color': StyleConfig.GRAY_DARK,
+    'bold': False,
+    'alignment': PP_ALIGN.LEFT
+})
+
+_INDEX_STYLE = MappingProxyType({
+    'font_name': StyleConfig.FONT_BODY,
+    'font_size': StyleConfig.FONT_SIZE_BODY,
+    'font_color': StyleConfig.GRAY_DARK,
+    'number_color': StyleConfig.ORANGE_PRIMARY,
+    'bold': False,
+    'alignment': PP_ALIGN.LEFT
+})